@@ -1,6 +1,7 @@
+import contextlib
 import typing
 
-from PySide.QtGui import QIcon, QPaintEvent, QResizeEvent, QColor
+from PySide.QtGui import QIcon, QPaintEvent, QPainter, QPen, QResizeEvent, QShowEvent, QColor
 from PySide.QtWidgets import (
     QToolButton,
     QSizePolicy,
@@ -15,12 +16,15 @@ from PySide.QtCore import (
     Qt,
     Signal,
     QSize,
+    QPoint,
 )
 
-from .constants import RibbonCategoryStyle
+from .commands import RibbonCommandRegistry
+from .constants import RibbonCategoryStyle, RibbonPanelStage
 from .panel import RibbonPanel
+from .pool import RibbonWidgetPool
 from .separator import RibbonSeparator
-from .utils import DataFile
+from .utils import DataFile, suspendUpdates
 
 if typing.TYPE_CHECKING:
     from .ribbonbar import RibbonBar  # noqa: F401
@@ -43,7 +47,35 @@ class RibbonCategoryScrollArea(QScrollArea):
 class RibbonCategoryScrollAreaContents(QFrame):
     """Scroll area contents for the gallery"""
 
-    pass
+    _topMargins: int = 4
+    _bottomMargins: int = 4
+
+    def __init__(self, parent=None):
+        """Create a new scroll area contents.
+
+        :param parent: The parent widget.
+        """
+        super().__init__(parent)
+        #: spacer items of the layout painted as vertical separators
+        self._separators = []  # type: typing.List[QSpacerItem]
+
+    def paintEvent(self, a0: QPaintEvent) -> None:
+        """Paint the background and the separators of the panels in a single pass."""
+        super().paintEvent(a0)
+        if not self._separators:
+            return
+        painter = QPainter(self)
+        pen = QPen()
+        pen.setColor(QColor(Qt.GlobalColor.gray))
+        painter.setPen(pen)
+        for separator in self._separators:
+            rect = separator.geometry()
+            if rect.intersects(a0.rect()):
+                x1 = rect.center().x()
+                painter.drawLine(
+                    QPoint(x1, rect.top() + self._topMargins),
+                    QPoint(x1, rect.bottom() - self._bottomMargins),
+                )
 
 
 class RibbonCategoryLayoutWidget(QFrame):
@@ -51,6 +83,9 @@ class RibbonCategoryLayoutWidget(QFrame):
 
     displayOptionsButtonClicked = Signal()
 
+    #: visibility of the previous and next buttons, None until it is set
+    _scrollButtonsVisible: typing.Optional[typing.Tuple[bool, bool]] = None
+
     def __init__(self, parent=None):
         """Create a new category layout widget.
 
@@ -105,12 +140,14 @@ class RibbonCategoryLayoutWidget(QFrame):
                                                              QSizePolicy.Policy.Minimum))  # fmt: skip
         self._mainLayout.addWidget(self._nextButton, 0, Qt.AlignmentFlag.AlignVCenter)
 
-        # Auto set the visibility of the scroll buttons
+        # Auto set the visibility of the scroll buttons when the scroll range or position changes
+        horizontalScrollBar = self._categoryScrollArea.horizontalScrollBar()
+        horizontalScrollBar.rangeChanged.connect(self._scrollBarChanged)  # type: ignore
+        horizontalScrollBar.valueChanged.connect(self._scrollBarChanged)  # type: ignore
         self.autoSetScrollButtonsVisible()
 
-    def paintEvent(self, a0: QPaintEvent) -> None:
-        """Override the paint event to draw the background."""
-        super().paintEvent(a0)
+    def _scrollBarChanged(self, *args):
+        """Update the visibility of the scroll buttons when the range or the value of the scroll bar changes."""
         self.autoSetScrollButtonsVisible()
 
     def resizeEvent(self, a0: QResizeEvent) -> None:
@@ -119,29 +156,34 @@ class RibbonCategoryLayoutWidget(QFrame):
         self.autoSetScrollButtonsVisible()
 
     def autoSetScrollButtonsVisible(self):
-        """Set the visibility of the scroll buttons."""
+        """Set the visibility and the icon size of the scroll buttons, they are only updated when they change.
+
+        It is called when the range or the value of the scroll bar changes and when the category is resized.
+        """
         horizontalScrollBar = self._categoryScrollArea.horizontalScrollBar()
-        self._previousButton.setVisible(
-            horizontalScrollBar.value() > horizontalScrollBar.minimum()
+        visible = (
+            horizontalScrollBar.value() > horizontalScrollBar.minimum(),
+            horizontalScrollBar.value() < horizontalScrollBar.maximum(),
         )
-        self._nextButton.setVisible(
-            horizontalScrollBar.value() < horizontalScrollBar.maximum()
-        )
-        self._previousButton.setIconSize(QSize(12, self.size().height() - 15))
-        self._nextButton.setIconSize(QSize(12, self.size().height() - 15))
+        if visible != self._scrollButtonsVisible:
+            self._scrollButtonsVisible = visible
+            self._previousButton.setVisible(visible[0])
+            self._nextButton.setVisible(visible[1])
+        iconSize = QSize(12, self.size().height() - 15)
+        if self._previousButton.iconSize() != iconSize:
+            self._previousButton.setIconSize(iconSize)
+            self._nextButton.setIconSize(iconSize)
 
     def scrollPrevious(self):
         """Scroll the category to the previous widget."""
         horizontalScrollBar = self._categoryScrollArea.horizontalScrollBar()
         horizontalScrollBar.setValue(horizontalScrollBar.value() - 50)
-        self.autoSetScrollButtonsVisible()
 
     def scrollNext(self):
         """Scroll the category to the next widget."""
         self._categoryScrollArea.horizontalScrollBar().setValue(
             self._categoryScrollArea.horizontalScrollBar().value() + 50
         )
-        self.autoSetScrollButtonsVisible()
 
     def addWidget(self, widget: QWidget):
         """Add a widget to the category layout.
@@ -180,6 +222,18 @@ class RibbonCategory(RibbonCategoryLayoutWidget):
     _color: typing.Optional[QColor]
     #: Maximum rows
     _maxRows: int = 6
+    #: Registry of the named widgets of the ribbon
+    _commandRegistry: typing.Optional[RibbonCommandRegistry] = None
+    #: Pool of the widgets released from the panels
+    _widgetPool: typing.Optional[RibbonWidgetPool] = None
+    #: Whether the panels are reduced when the category is too narrow
+    _adaptiveLayout: bool = False
+    #: Separators after the panels, widgets or spacer items painted by the scroll area contents
+    _separators: typing.Dict[RibbonPanel, typing.Union[RibbonSeparator, QSpacerItem]]
+    #: Whether the separators of the panels are painted by the scroll area contents instead of being widgets
+    _panelSeparatorsPainted: bool = False
+    #: Callable adding the panels of the category the first time it is shown, None once it is called
+    _builder: typing.Optional[typing.Callable[["RibbonCategory"], typing.Any]] = None
 
     @typing.overload
     def __init__(
@@ -223,6 +277,7 @@ class RibbonCategory(RibbonCategoryLayoutWidget):
         self._title = title
         self._style = style
         self._panels = {}
+        self._separators = {}
         self._ribbon = parent  # type: RibbonBar
         self._color = color
 
@@ -252,12 +307,127 @@ class RibbonCategory(RibbonCategoryLayoutWidget):
         """
         return self._style
 
+    @contextlib.contextmanager
+    def batchUpdate(self):
+        """Suspend the repaint and the layout of the category in the context, the category is laid out and
+        repainted once on exit. The contexts can be nested.
+
+        .. code-block:: python
+
+            with category.batchUpdate():
+                category.addPanel("Panel 1")
+                category.addPanel("Panel 2")
+        """
+        with suspendUpdates(self, self._mainLayout, self._categoryLayout):
+            yield
+
+    def setBuilder(self, builder: typing.Optional[typing.Callable[["RibbonCategory"], typing.Any]]):
+        """Set a callable adding the panels of the category, it is called with the category the first time the
+        category is shown or its panels are accessed.
+
+        :param builder: The builder, None to not build the category.
+        """
+        self._builder = builder
+
+    def isBuilt(self) -> bool:
+        """Return whether the builder of the category has been called, or the category has no builder.
+
+        :return: Whether the category is built.
+        """
+        return self._builder is None
+
+    def build(self):
+        """Call the builder of the category, nothing happens if the category is built."""
+        builder, self._builder = self._builder, None
+        if builder is not None:
+            with self.batchUpdate():
+                builder(self)
+
+    def showEvent(self, a0: QShowEvent) -> None:
+        """Build the category when it is shown for the first time."""
+        self.build()
+        super().showEvent(a0)
+
+    def _setCommandRegistry(self, registry: typing.Optional[RibbonCommandRegistry]):
+        """Move the named widgets of the panels to a command registry.
+
+        :param registry: The registry of the ribbon, None to unregister the widgets.
+        """
+        self._commandRegistry = registry
+        for panel in self._panels.values():
+            panel._setCommandRegistry(registry, self._title)
+
+    def _setWidgetPool(self, pool: typing.Optional[RibbonWidgetPool]):
+        """Set the pool the widgets released from the panels are recycled to.
+
+        :param pool: The widget pool of the ribbon, None to not recycle the widgets.
+        """
+        self._widgetPool = pool
+        for panel in self._panels.values():
+            panel.setWidgetPool(pool)
+
+    def adaptiveLayout(self) -> bool:
+        """Return whether the panels are reduced when the category is too narrow to show them.
+
+        :return: Whether the adaptive layout is enabled.
+        """
+        return self._adaptiveLayout
+
+    def setAdaptiveLayout(self, adaptive: bool):
+        """Set whether the panels are reduced when the category is too narrow to show them. The panels step down
+        from the Large stage to the Medium, Small and Collapsed stages, from the last panel to the first one,
+        until they fit in the category. The scroll buttons are still shown if the collapsed panels do not fit.
+
+        :param adaptive: Whether to enable the adaptive layout.
+        """
+        self._adaptiveLayout = adaptive
+        if adaptive:
+            self.reducePanels()
+        else:
+            for panel in self._panels.values():
+                panel.setStage(RibbonPanelStage.Large)
+
+    def reducePanels(self):
+        """Reduce the panels to fit the width of the category, see setAdaptiveLayout().
+
+        The widths of the panels at each stage are cached by the panels, only the panels whose stage changes are
+        laid out again.
+        """
+        panels = list(self._panels.values())
+        if not panels:
+            return
+        available = self.width() - 2 * self._categoryScrollArea.frameWidth()
+        total = self._categoryLayout.spacing() * max(self._categoryLayout.count() - 1, 0)
+        for index in range(self._categoryLayout.count()):
+            item = self._categoryLayout.itemAt(index)
+            if item.widget() not in panels:
+                total += item.sizeHint().width()
+        stages = [RibbonPanelStage.Large] * len(panels)
+        total += sum(panel.stageWidth(RibbonPanelStage.Large) for panel in panels)
+        for stage in list(RibbonPanelStage)[1:]:
+            for index in reversed(range(len(panels))):
+                if total <= available:
+                    break
+                reduction = panels[index].stageWidth(stages[index]) - panels[index].stageWidth(stage)
+                if reduction > 0:
+                    total -= reduction
+                    stages[index] = stage
+        for panel, stage in zip(panels, stages):
+            panel.setStage(stage)
+
+    def resizeEvent(self, a0: QResizeEvent) -> None:
+        """Reduce the panels when the width of the category changes and the adaptive layout is enabled."""
+        super().resizeEvent(a0)
+        if self._adaptiveLayout and a0.size().width() != a0.oldSize().width():
+            self.reducePanels()
+
     def addPanelsBy(
         self,
         data: typing.Dict[
             str,  # title of the panel
             typing.Dict,  # data of the panel
         ],
+        lazy: bool = False,
     ) -> typing.Dict[str, RibbonPanel]:
         """Add panels from a dictionary.
 
@@ -283,13 +453,16 @@ class RibbonCategory(RibbonCategoryLayoutWidget):
                                 }
                             },
                         }
+        :param lazy: Whether to construct the widgets of the panels lazily, when the panels are shown for the first
+                     time, see RibbonPanel.addWidgetsBy().
         :return: A dictionary of the newly created panels.
         """
         panels = {}
-        for title, panel_data in data.items():
-            showPanelOptionButton = panel_data.get("showPanelOptionButton", True)
-            panels[title] = self.addPanel(title, showPanelOptionButton)
-            panels[title].addWidgetsBy(panel_data.get("widgets", {}))
+        with self.batchUpdate():
+            for title, panel_data in data.items():
+                showPanelOptionButton = panel_data.get("showPanelOptionButton", True)
+                panels[title] = self.addPanel(title, showPanelOptionButton)
+                panels[title].addWidgetsBy(panel_data.get("widgets", {}), lazy=lazy)
         return panels
 
     def addPanel(self, title: str, showPanelOptionButton=True) -> RibbonPanel:
@@ -299,6 +472,22 @@ class RibbonCategory(RibbonCategoryLayoutWidget):
         :param showPanelOptionButton: Whether to show the panel option button.
         :return: The newly created panel.
         """
+        self.build()
+        return self.insertPanel(len(self._panels), title, showPanelOptionButton)
+
+    def insertPanel(self, index: int, title: str, showPanelOptionButton=True) -> RibbonPanel:
+        """Insert a new panel into the category.
+
+        :param index: The index of the panel among the panels of the category, the panel is appended if the index
+                      is out of range.
+        :param title: The title of the panel.
+        :param showPanelOptionButton: Whether to show the panel option button.
+        :return: The newly created panel.
+        :raises ValueError: If a panel with the title already exists.
+        """
+        self.build()
+        if title in self._panels:
+            raise ValueError(f"Panel with title {title} already exists.")
         panel = RibbonPanel(
             title,
             maxRows=self._maxRows,
@@ -311,19 +500,144 @@ class RibbonCategory(RibbonCategoryLayoutWidget):
             - self._mainLayout.contentsMargins().top()
             - self._mainLayout.contentsMargins().bottom()
         )
+        panel._setCommandRegistry(self._commandRegistry, self._title)
+        panel.setWidgetPool(self._widgetPool)
+        self._separators[panel] = self._createSeparator()
+        titles = list(self._panels)
+        titles.insert(index, title)
         self._panels[title] = panel
-        self.addWidget(panel)  # type: ignore
-        self.addWidget(RibbonSeparator(width=10))  # type: ignore
+        self._arrangePanels(titles, [panel])
         return panel
 
+    def movePanel(self, title: str, index: int):
+        """Move a panel of the category, the widgets are rearranged in a single layout pass.
+
+        :param title: The title of the panel.
+        :param index: The new index of the panel among the panels of the category.
+        """
+        self.build()
+        titles = list(self._panels)
+        titles.remove(title)
+        titles.insert(index, title)
+        self._arrangePanels(titles, [self._panels[title]])
+
+    def setPanelOrder(self, titles: typing.List[str]):
+        """Reorder the panels of the category, the widgets are rearranged in a single layout pass.
+
+        :param titles: The titles of all the panels of the category, in the new order.
+        :raises ValueError: If the titles are not the titles of the panels.
+        """
+        self.build()
+        if sorted(titles) != sorted(self._panels):
+            raise ValueError(f"The titles {titles} are not the titles of the panels {list(self._panels)}.")
+        self._arrangePanels(titles, [self._panels[title] for title in titles])
+
+    def _arrangePanels(self, titles: typing.List[str], panels: typing.List[RibbonPanel]):
+        """Move panels and their separators into the category layout, in the order of the titles.
+
+        The panels are placed from the last one, before the panel that follows them, so that only the moved panels
+        are taken out of the layout.
+
+        :param titles: The titles of all the panels, in the new order.
+        :param panels: The panels to move, the panels that are not in the layout yet are inserted.
+        """
+        moved = set(panels)
+        with self.batchUpdate():
+            for panel in panels:
+                if self._categoryLayout.indexOf(panel) >= 0:
+                    self._categoryLayout.removeWidget(panel)
+                    self._takeSeparator(self._separators[panel])
+            following = None  # type: typing.Optional[RibbonPanel]
+            for title in reversed(titles):
+                panel = self._panels[title]
+                if panel in moved:
+                    index = (
+                        self._categoryLayout.indexOf(following)
+                        if following is not None
+                        else self._categoryLayout.count()
+                    )
+                    self._insertSeparator(index, self._separators[panel])
+                    self._categoryLayout.insertWidget(index, panel)
+                following = panel
+        self._panels = {title: self._panels[title] for title in titles}
+
+    def _createSeparator(self) -> typing.Union[RibbonSeparator, QSpacerItem]:
+        """Create the separator after a panel, a spacer item when the separators are painted."""
+        if self._panelSeparatorsPainted:
+            return QSpacerItem(10, 0, QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Minimum)
+        return RibbonSeparator(width=10)
+
+    def _insertSeparator(self, index: int, separator: typing.Union[RibbonSeparator, QSpacerItem]):
+        """Insert a separator into the category layout.
+
+        :param index: The index in the layout.
+        :param separator: The separator widget or spacer item.
+        """
+        if isinstance(separator, QWidget):
+            self._categoryLayout.insertWidget(index, separator)
+        else:
+            self._categoryLayout.insertSpacerItem(index, separator)
+            self._categoryScrollAreaContents._separators.append(separator)
+
+    def _takeSeparator(self, separator: typing.Union[RibbonSeparator, QSpacerItem]) -> int:
+        """Take a separator out of the category layout.
+
+        :param separator: The separator widget or spacer item.
+        :return: The index the separator had in the layout.
+        """
+        index = self._categoryLayout.indexOf(separator)
+        if isinstance(separator, QWidget):
+            self._categoryLayout.removeWidget(separator)
+        else:
+            self._categoryLayout.removeItem(separator)
+            self._categoryScrollAreaContents._separators.remove(separator)
+        return index
+
+    def _removeSeparator(self, separator: typing.Union[RibbonSeparator, QSpacerItem]) -> int:
+        """Remove a separator from the category layout, the separator widgets are deleted.
+
+        :param separator: The separator widget or spacer item.
+        :return: The index the separator had in the layout.
+        """
+        index = self._takeSeparator(separator)
+        if isinstance(separator, QWidget):
+            separator.deleteLater()
+        return index
+
+    def panelSeparatorsPainted(self) -> bool:
+        """Return whether the separators of the panels are painted by the category instead of being widgets.
+
+        :return: Whether the separators are painted.
+        """
+        return self._panelSeparatorsPainted
+
+    def setPanelSeparatorsPainted(self, painted: bool):
+        """Set whether the separators of the panels are painted by the category in a single paint pass, instead of
+        being a separator widget after each panel.
+
+        :param painted: Whether the separators are painted.
+        """
+        if painted == self._panelSeparatorsPainted:
+            return
+        self._panelSeparatorsPainted = painted
+        with self.batchUpdate():
+            for panel, separator in self._separators.items():
+                index = self._removeSeparator(separator)
+                self._separators[panel] = self._createSeparator()
+                self._insertSeparator(index, self._separators[panel])
+
     def removePanel(self, title: str):
         """Remove a panel from the category.
 
         :param title: The title of the panel.
         """
         # self._panelLayout.removeWidget(self._panels[title])
-        self.removeWidget(self._panels[title])
-        self._panels.pop(title)
+        self.build()
+        panel = self._panels.pop(title)
+        panel._setCommandRegistry(None, "")
+        with self.batchUpdate():
+            self.removeWidget(panel)
+            self._removeSeparator(self._separators.pop(panel))
 
     def takePanel(self, title: str) -> RibbonPanel:
         """Remove and return a panel from the category.
@@ -331,7 +645,7 @@ class RibbonCategory(RibbonCategoryLayoutWidget):
         :param title: The title of the panel.
         :return: The removed panel.
         """
-        panel = self._panels[title]
+        panel = self.panel(title)
         self.removePanel(title)
         return panel
 
@@ -341,6 +655,7 @@ class RibbonCategory(RibbonCategoryLayoutWidget):
         :param title: The title of the panel.
         :return: The panel.
         """
+        self.build()
         return self._panels[title]
 
     def panels(self) -> typing.Dict[str, RibbonPanel]:
@@ -348,6 +663,7 @@ class RibbonCategory(RibbonCategoryLayoutWidget):
 
         :return: The panels.
         """
+        self.build()
         return self._panels
 
 
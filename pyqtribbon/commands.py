@@ -0,0 +1,80 @@
+import typing
+
+from PySide.QtWidgets import QWidget
+
+
+class RibbonCommandRegistry(object):
+    """Index of the named widgets of a ribbon, by category, panel and name.
+
+    The panels register their widgets that have an object name when they are added, and unregister them when they
+    are removed, so that a widget can be looked up by its path without walking the categories and panels.
+    """
+
+    #: widgets by (category, panel, name)
+    _commands: typing.Dict[typing.Tuple[str, str, str], QWidget]
+    #: widgets by (panel, name), in the order they were registered
+    _panelCommands: typing.Dict[typing.Tuple[str, str], typing.List[QWidget]]
+    #: widgets by name, in the order they were registered
+    _namedCommands: typing.Dict[str, typing.List[QWidget]]
+
+    def __init__(self):
+        """Create a new command registry."""
+        self._commands = {}
+        self._panelCommands = {}
+        self._namedCommands = {}
+
+    def register(self, category: str, panel: str, name: str, widget: QWidget):
+        """Register a widget.
+
+        :param category: The title of the category.
+        :param panel: The title of the panel.
+        :param name: The name of the widget.
+        :param widget: The widget.
+        """
+        self._commands[(category, panel, name)] = widget
+        self._panelCommands.setdefault((panel, name), []).append(widget)
+        self._namedCommands.setdefault(name, []).append(widget)
+
+    def unregister(self, category: str, panel: str, name: str, widget: QWidget):
+        """Unregister a widget, nothing happens if it is not registered.
+
+        :param category: The title of the category.
+        :param panel: The title of the panel.
+        :param name: The name of the widget.
+        :param widget: The widget.
+        """
+        if self._commands.get((category, panel, name)) is widget:
+            del self._commands[(category, panel, name)]
+        for index, key in ((self._panelCommands, (panel, name)), (self._namedCommands, name)):
+            widgets = index.get(key, [])
+            if widget in widgets:
+                widgets.remove(widget)
+                if not widgets:
+                    del index[key]
+
+    def command(self, path: str) -> QWidget:
+        """Return the widget at a path.
+
+        :param path: The path of the widget, "category/panel/name", "panel/name" or "name". When the path is not
+                     complete and several widgets match, the one registered first is returned.
+        :return: The widget.
+        :raises KeyError: If no widget matches the path.
+        """
+        parts = path.split("/")
+        if len(parts) == 3:
+            return self._commands[(parts[0], parts[1], parts[2])]
+        if len(parts) == 2:
+            widgets = self._panelCommands.get((parts[0], parts[1]))
+        else:
+            widgets = self._namedCommands.get(path)
+        if not widgets:
+            raise KeyError(path)
+        return widgets[0]
+
+    def commands(self, name: str) -> typing.List[QWidget]:
+        """Return the widgets with a name in all the categories and panels.
+
+        :param name: The name of the widgets.
+        :return: The widgets, in the order they were registered.
+        """
+        return list(self._namedCommands.get(name, []))
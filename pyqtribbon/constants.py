@@ -36,6 +36,17 @@ ColumnWise = RibbonSpaceFindMode.ColumnWise
 RowWise = RibbonSpaceFindMode.RowWise
 
 
+class RibbonGridBackend(IntEnum):
+    """Storage of the cells of a panel grid, Bitset (pure Python) or NumPy."""
+
+    Bitset = 0
+    NumPy = 1
+
+
+Bitset = RibbonGridBackend.Bitset
+NumPy = RibbonGridBackend.NumPy
+
+
 class RibbonStyle(IntEnum):
     Default = 0
     Debug = 1
@@ -45,6 +56,17 @@ Debug = RibbonStyle.Debug
 Default = RibbonStyle.Default
 
 
+class RibbonStyleBackend(IntEnum):
+    """Rendering of the ribbon styles, StyleSheet (Qt style sheets) or ProxyStyle (a proxy style and palettes)."""
+
+    StyleSheet = 0
+    ProxyStyle = 1
+
+
+StyleSheet = RibbonStyleBackend.StyleSheet
+ProxyStyle = RibbonStyleBackend.ProxyStyle
+
+
 class RibbonButtonStyle(IntEnum):
     """Button style, Small, Medium, or Large."""
 
@@ -56,3 +78,15 @@ class RibbonButtonStyle(IntEnum):
 Small = RibbonButtonStyle.Small
 Medium = RibbonButtonStyle.Medium
 Large = RibbonButtonStyle.Large
+
+
+class RibbonPanelStage(IntEnum):
+    """Reduction stage of a panel when the category is too narrow, from the full layout to a collapsed button."""
+
+    Large = 0
+    Medium = 1
+    Small = 2
+    Collapsed = 3
+
+
+Collapsed = RibbonPanelStage.Collapsed
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
+import collections
+import contextlib
 import functools
+import heapq
+import inspect
 import re
-from typing import Any, Callable, Dict, List, Union, overload
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple, Union, overload
 
-import numpy as np
-
-from PySide.QtGui import QIcon, QKeySequence
+from PySide.QtGui import QIcon, QKeySequence, QResizeEvent, QShowEvent
 from PySide.QtWidgets import (
     QToolButton,
     QSizePolicy,
@@ -37,6 +40,8 @@ from PySide.QtWidgets import (
 )
 from PySide.QtCore import (
     Qt,
+    QEvent,
+    QPoint,
     QSize,
     Signal,
 )
@@ -44,16 +49,21 @@ from PySide.QtCore import (
 
 from .constants import (
     ColumnWise,
+    RibbonGridBackend,
     Large,
     Medium,
     RibbonButtonStyle,
+    RibbonPanelStage,
     RibbonSpaceFindMode,
     Small,
 )
+from .commands import RibbonCommandRegistry
 from .gallery import RibbonGallery
+from .pool import RibbonWidgetPool
 from .separator import RibbonSeparator
+from .style import RibbonProxyStyle
 from .toolbutton import RibbonToolButton
-from .utils import DataFile
+from .utils import DataFile, suspendUpdates
 
 
 class RibbonPanelTitle(QLabel):
@@ -62,16 +72,306 @@ class RibbonPanelTitle(QLabel):
     pass
 
 
+class RibbonGridBitset(object):
+    """Cells of a grid stored as one integer per column, the bit r of a column is set if the cell in row r is
+    occupied. A span of rows is tested and updated with a single bitwise operation.
+    """
+
+    def __init__(self, rows: int, capacity: int):
+        """Create a new bitset with all the cells available.
+
+        :param rows: The number of rows.
+        :param capacity: The number of columns to allocate.
+        """
+        self.rows = rows
+        self._columns = [0] * capacity
+
+    def capacity(self) -> int:
+        """Return the number of allocated columns."""
+        return len(self._columns)
+
+    def reserve(self, columns: int):
+        """Allocate at least the given number of columns, the storage grows geometrically.
+
+        :param columns: The number of columns.
+        """
+        if columns > len(self._columns):
+            self._columns.extend([0] * (max(columns, 2 * len(self._columns)) - len(self._columns)))
+
+    def occupied(self, col: int) -> int:
+        """Return the occupied rows of a column as a bitmask.
+
+        :param col: The column.
+        :return: The bitmask of the occupied rows.
+        """
+        return self._columns[col]
+
+    def setAvailable(self, row: int, col: int, rowSpan: int, colSpan: int, available: bool):
+        """Set the availability of a block of cells.
+
+        :param row: The first row of the cells.
+        :param col: The first column of the cells.
+        :param rowSpan: The number of rows of the cells.
+        :param colSpan: The number of columns of the cells.
+        :param available: Whether the cells are available.
+        """
+        mask = ((1 << rowSpan) - 1) << row
+        for c in range(col, col + colSpan):
+            self._columns[c] = self._columns[c] & ~mask if available else self._columns[c] | mask
+
+    def cells(self, columns: int) -> List[List[bool]]:
+        """Return the availability of the cells in the first columns.
+
+        :param columns: The number of columns.
+        :return: A rows x columns nested list, True if the cell is available.
+        """
+        return [[not (self._columns[c] >> r) & 1 for c in range(columns)] for r in range(self.rows)]
+
+
+class RibbonGridArray(object):
+    """Cells of a grid stored in a NumPy boolean matrix, True if the cell is available. NumPy is only imported
+    when this storage is used.
+    """
+
+    def __init__(self, rows: int, capacity: int):
+        """Create a new matrix with all the cells available.
+
+        :param rows: The number of rows.
+        :param capacity: The number of columns to allocate.
+        """
+        import numpy
+
+        self.rows = rows
+        self._numpy = numpy
+        self._cells = numpy.ones((rows, capacity), dtype=bool)
+
+    def capacity(self) -> int:
+        """Return the number of allocated columns."""
+        return self._cells.shape[1]
+
+    def reserve(self, columns: int):
+        """Allocate at least the given number of columns, the matrix grows geometrically.
+
+        :param columns: The number of columns.
+        """
+        if columns > self._cells.shape[1]:
+            cells = self._numpy.ones((self.rows, max(columns, 2 * self._cells.shape[1])), dtype=bool)
+            cells[:, : self._cells.shape[1]] = self._cells
+            self._cells = cells
+
+    def occupied(self, col: int) -> int:
+        """Return the occupied rows of a column as a bitmask.
+
+        :param col: The column.
+        :return: The bitmask of the occupied rows.
+        """
+        return sum(1 << row for row, available in enumerate(self._cells[:, col].tolist()) if not available)
+
+    def setAvailable(self, row: int, col: int, rowSpan: int, colSpan: int, available: bool):
+        """Set the availability of a block of cells.
+
+        :param row: The first row of the cells.
+        :param col: The first column of the cells.
+        :param rowSpan: The number of rows of the cells.
+        :param colSpan: The number of columns of the cells.
+        :param available: Whether the cells are available.
+        """
+        self._cells[row : row + rowSpan, col : col + colSpan] = available
+
+    def cells(self, columns: int):
+        """Return the availability of the cells in the first columns.
+
+        :param columns: The number of columns.
+        :return: A view of the first columns of the matrix, True if the cell is available.
+        """
+        return self._cells[:, :columns]
+
+
 class RibbonGridLayoutManager(object):
     """Grid Layout Manager."""
 
-    def __init__(self, rows: int):
+    #: number of columns allocated up front for the cells
+    _initialCapacity: int = 8
+
+    def __init__(self, rows: int, backend: RibbonGridBackend = RibbonGridBackend.Bitset):
         """Create a new grid layout manager.
 
         :param rows: The number of rows in the grid layout.
+        :param backend: The storage of the cells, Bitset (default) or NumPy.
         """
         self.rows = rows
-        self.cells = np.ones((rows, 1), dtype=bool)
+        self.columns = 1
+        # The cells are over-allocated and grown geometrically, only the first `columns` columns are in use,
+        # the remaining columns are always available.
+        self._storage = (
+            RibbonGridArray(rows, self._initialCapacity)
+            if backend == RibbonGridBackend.NumPy
+            else RibbonGridBitset(rows, self._initialCapacity)
+        )
+        self._fullMask = (1 << rows) - 1
+        # Occupancy index: the longest run of available rows of every used column, and for every span n the set
+        # of columns that still have a run of at least n available rows, the other columns are never searched.
+        self._freeRuns = [rows]
+        self._fitColumns = [set()] + [{0} for _ in range(rows)]
+        # First-fit index: the first row of the first run of n available rows of every used column (-1 if there is
+        # none), and for every span n and first row, a heap of the columns whose first run of n rows starts there.
+        # The heaps are cleaned lazily, an entry is valid while the first row of its column is unchanged.
+        self._firstRows = [[-1] + [0] * rows]
+        self._firstRowColumns = [[[] for _ in range(rows)] for _ in range(rows + 1)]
+        for n in range(1, rows + 1):
+            self._firstRowColumns[n][0].append(0)
+        # The cells taken by every request, keyed by the (row, col) returned to the requester
+        self._regions = {}  # type: Dict[Tuple[int, int], Tuple[int, int]]
+
+    @property
+    def cells(self):
+        """The availability of the cells in use, True if the cell is available.
+
+        :return: A rows x columns nested list with the Bitset backend, a view of the NumPy matrix with the
+                 NumPy backend.
+        """
+        return self._storage.cells(self.columns)
+
+    def capacity(self) -> int:
+        """Return the number of columns allocated for the cells.
+
+        :return: The number of allocated columns.
+        """
+        return self._storage.capacity()
+
+    @staticmethod
+    def _firstRun(available: int, rowSpan: int) -> int:
+        """Return the first row from which `rowSpan` rows are available.
+
+        :param available: The bitmask of the available rows.
+        :param rowSpan: The number of rows.
+        :return: The first row of the run, or -1 if there is no such run.
+        """
+        for _ in range(rowSpan - 1):
+            available &= available >> 1
+        return (available & -available).bit_length() - 1
+
+    @staticmethod
+    def _longestRun(available: int) -> int:
+        """Return the length of the longest run of available rows.
+
+        :param available: The bitmask of the available rows.
+        :return: The number of rows in the longest run.
+        """
+        longest = 0
+        while available:
+            available &= available >> 1
+            longest += 1
+        return longest
+
+    def reserve(self, columns: int):
+        """Make sure the cells can hold the given number of columns without being reallocated.
+
+        :param columns: The number of columns.
+        """
+        self._storage.reserve(columns)
+
+    def _appendColumns(self, count: int):
+        """Append available columns to the grid, the cells are reallocated only when the capacity is exceeded.
+
+        :param count: The number of columns to append.
+        """
+        columns = self.columns + count
+        self.reserve(columns)
+        self._freeRuns.extend([self.rows] * count)
+        for fitColumns in self._fitColumns[1:]:
+            fitColumns.update(range(self.columns, columns))
+        for col in range(self.columns, columns):
+            self._firstRows.append([-1] + [0] * self.rows)
+            for n in range(1, self.rows + 1):
+                self._pushFirstRow(n, 0, col)
+        self.columns = columns
+
+    def _updateFreeRun(self, col: int):
+        """Update the occupancy index of a column after its cells changed.
+
+        :param col: The column.
+        """
+        longest = self._longestRun(self._fullMask & ~self._storage.occupied(col))
+        previous = self._freeRuns[col]
+        for n in range(longest + 1, previous + 1):
+            self._fitColumns[n].discard(col)
+        for n in range(previous + 1, longest + 1):
+            self._fitColumns[n].add(col)
+        self._freeRuns[col] = longest
+        available = self._fullMask & ~self._storage.occupied(col)
+        firstRows = self._firstRows[col]
+        for n in range(1, self.rows + 1):
+            row = (available & -available).bit_length() - 1
+            if row != firstRows[n]:
+                firstRows[n] = row
+                if row >= 0:
+                    self._pushFirstRow(n, row, col)
+            available &= available >> 1
+
+    def _pushFirstRow(self, rowSpan: int, row: int, col: int):
+        """Add a column to the first-fit index, the heap is rebuilt without its stale entries when it has grown
+        twice as large as the number of columns.
+
+        :param rowSpan: The number of rows of the run.
+        :param row: The first row of the first run of the column.
+        :param col: The column.
+        """
+        columns = self._firstRowColumns[rowSpan][row]
+        heapq.heappush(columns, col)
+        if len(columns) > 2 * self.columns + 8:
+            columns[:] = {
+                c for c in columns if c < len(self._firstRows) and self._firstRows[c][rowSpan] == row
+            }
+            heapq.heapify(columns)
+
+    def _occupy(self, row: int, col: int, rowSpan: int, colSpan: int):
+        """Mark the cells as occupied, remember them as requested from (row, col), and update the occupancy index.
+
+        :param row: The first row of the cells.
+        :param col: The first column of the cells.
+        :param rowSpan: The number of rows of the cells.
+        :param colSpan: The number of columns of the cells.
+        """
+        self._storage.setAvailable(row, col, rowSpan, colSpan, False)
+        self._regions[(row, col)] = (rowSpan, colSpan)
+        for c in range(col, col + colSpan):
+            self._updateFreeRun(c)
+
+    def _findColumnWise(self, rowSpan: int, colSpan: int):
+        """Find the first available cells row by row.
+
+        The cells of a single column are looked up in the first-fit index, from the first row down, in O(rows)
+        heap lookups. The cells of several columns are searched in the columns that have enough available rows
+        according to the occupancy index.
+
+        :param rowSpan: The number of rows the cell should span.
+        :param colSpan: The number of columns the cell should span.
+        :return: row, col of the cells, or None if there is no room in the used columns.
+        """
+        if colSpan == 1:
+            for row, columns in enumerate(self._firstRowColumns[rowSpan]):
+                while columns and (columns[0] >= self.columns or self._firstRows[columns[0]][rowSpan] != row):
+                    heapq.heappop(columns)
+                if columns:
+                    return row, columns[0]
+            return None
+        fitColumns = self._fitColumns[rowSpan]
+        found = None
+        for col in sorted(fitColumns):
+            if col + colSpan > self.columns:
+                break
+            if any(c not in fitColumns for c in range(col + 1, col + colSpan)):
+                continue
+            occupied = 0
+            for c in range(col, col + colSpan):
+                occupied |= self._storage.occupied(c)
+            row = self._firstRun(self._fullMask & ~occupied, rowSpan)
+            if row >= 0 and (found is None or row < found[0]):
+                found = (row, col)
+                if row == 0:
+                    break
+        return found
 
     def request_cells(
         self, rowSpan: int = 1, colSpan: int = 1, mode: RibbonSpaceFindMode = ColumnWise
@@ -86,36 +386,164 @@ class RibbonGridLayoutManager(object):
         if rowSpan > self.rows:
             raise ValueError("RowSpan is too large")
         if mode == ColumnWise:
-            for row in range(self.cells.shape[0] - rowSpan + 1):
-                for col in range(self.cells.shape[1] - colSpan + 1):
-                    if self.cells[row : row + rowSpan, col : col + colSpan].all():
-                        self.cells[row : row + rowSpan, col : col + colSpan] = False
-                        return row, col
+            found = self._findColumnWise(rowSpan, colSpan)
+            if found is not None:
+                self._occupy(found[0], found[1], rowSpan, colSpan)
+                return found
         else:
-            for col in range(self.cells.shape[1]):
-                if self.cells[0, col:].all():
-                    if self.cells.shape[1] - col < colSpan:
-                        self.cells = np.append(
-                            self.cells,
-                            np.ones(
-                                (self.rows, colSpan - (self.cells.shape[1] - col)),
-                                dtype=bool,
-                            ),
-                            axis=1,
-                        )
-                    self.cells[0, col:] = False
-                    return 0, col
-        cols = self.cells.shape[1]
+            # the first column from which the first row is available up to the last column
+            col = self.columns
+            while col > 0 and not self._storage.occupied(col - 1) & 1:
+                col -= 1
+            if col < self.columns:
+                if self.columns - col < colSpan:
+                    self._appendColumns(colSpan - (self.columns - col))
+                self._occupy(0, col, 1, self.columns - col)
+                return 0, col
+        cols = self.columns
         colSpan1 = colSpan
-        if self.cells[:, -1].all():
+        if self._freeRuns[-1] == self.rows:
             cols -= 1
             colSpan1 -= 1
-        self.cells = np.append(
-            self.cells, np.ones((self.rows, colSpan1), dtype=bool), axis=1
-        )
-        self.cells[:rowSpan, cols : cols + colSpan] = False
+        self._appendColumns(colSpan1)
+        self._occupy(0, cols, rowSpan, colSpan)
         return 0, cols
 
+    def request_many(
+        self, requests: Iterable[Tuple[int, int, RibbonSpaceFindMode]]
+    ) -> List[Tuple[int, int]]:
+        """Request cells for a batch of widgets at once.
+
+        All the requests are validated before any cell is taken, and the cells are allocated once for the
+        whole batch. The requests are placed in order, the result is the same as calling request_cells() for
+        each of them.
+
+        When the grid is empty, the placement of the batch is looked up in a plan cache shared by all the
+        managers, keyed by the number of rows and the requests, so that panels of the same shape are only
+        planned once, see plan_cache_info().
+
+        :param requests: The requests, each of them is a tuple of (rowSpan, colSpan, mode).
+        :return: A list of (row, col) of the requested cells, in the order of the requests.
+        """
+        requests = tuple((rowSpan, colSpan, mode) for rowSpan, colSpan, mode in requests)
+        if any(rowSpan > self.rows for rowSpan, _, _ in requests):
+            raise ValueError("RowSpan is too large")
+        if self.columns == 1 and not self._regions:
+            regions, columns = _planCells(self.rows, requests)
+            self._appendColumns(columns - self.columns)
+            for (row, col), (rowSpan, colSpan) in regions:
+                self._occupy(row, col, rowSpan, colSpan)
+            return [position for position, _ in regions]
+        self.reserve(self.columns + sum(colSpan for _, colSpan, _ in requests))
+        return [self.request_cells(rowSpan, colSpan, mode) for rowSpan, colSpan, mode in requests]
+
+    @staticmethod
+    def plan_cache_info():
+        """Return the statistics of the plan cache used by request_many().
+
+        :return: A named tuple of hits, misses, maxsize and currsize.
+        """
+        return _planCells.cache_info()
+
+    @staticmethod
+    def clear_plan_cache():
+        """Clear the plan cache used by request_many() and reset its statistics."""
+        _planCells.cache_clear()
+
+    def release_cells(self, row: int, col: int):
+        """Release the cells that were requested at the given position, so that they can be requested again.
+
+        The empty columns at the end of the grid are dropped.
+
+        :param row: The row returned by the request.
+        :param col: The column returned by the request.
+        """
+        if (row, col) not in self._regions:
+            raise ValueError(f"No cells are requested at ({row}, {col})")
+        rowSpan, colSpan = self._regions.pop((row, col))
+        self._storage.setAvailable(row, col, rowSpan, colSpan, True)
+        for c in range(col, col + colSpan):
+            self._updateFreeRun(c)
+        columns = self.columns
+        while columns > 1 and self._freeRuns[columns - 1] == self.rows:
+            columns -= 1
+        for fitColumns in self._fitColumns[1:]:
+            fitColumns.difference_update(range(columns, self.columns))
+        del self._freeRuns[columns:]
+        del self._firstRows[columns:]
+        self.columns = columns
+
+
+@functools.lru_cache(maxsize=128)
+def _planCells(
+    rows: int, requests: Tuple[Tuple[int, int, RibbonSpaceFindMode], ...]
+) -> Tuple[Tuple[Tuple[Tuple[int, int], Tuple[int, int]], ...], int]:
+    """Place a batch of requests in an empty grid.
+
+    :param rows: The number of rows of the grid.
+    :param requests: The requests, each of them is a tuple of (rowSpan, colSpan, mode).
+    :return: The cells taken by the requests as ((row, col), (rowSpan, colSpan)) in the order of the requests,
+             and the number of columns of the grid.
+    """
+    manager = RibbonGridLayoutManager(rows)
+    manager.reserve(1 + sum(colSpan for _, colSpan, _ in requests))
+    for rowSpan, colSpan, mode in requests:
+        manager.request_cells(rowSpan, colSpan, mode)
+    return tuple(manager._regions.items()), manager.columns
+
+
+#: pattern of the names of the sized add methods, e.g. addSmallComboBox
+_sizedMethodPattern = re.compile(r"add(Small|Medium|Large)([A-Z]\w*)")
+
+
+def _acceptsRowSpan(method: Callable) -> bool:
+    """Return whether a method accepts the rowSpan keyword argument."""
+    try:
+        parameters = inspect.signature(method).parameters
+    except (TypeError, ValueError):
+        return False
+    return "rowSpan" in parameters or any(
+        parameter.kind == inspect.Parameter.VAR_KEYWORD for parameter in parameters.values()
+    )
+
+
+def _specSpans(
+    method: Callable, kwargs: Mapping[str, Any]
+) -> Tuple[Union[int, RibbonButtonStyle], int, RibbonSpaceFindMode]:
+    """Return the cells a widget spec will request, from its keyword arguments or the defaults of its method.
+
+    :param method: The method that adds the widget.
+    :param kwargs: The keyword arguments passed to the method.
+    :return: The rowSpan (a number of rows or a button style), colSpan and mode of the widget.
+    """
+    parameters = inspect.signature(method).parameters
+
+    def argument(name: str, default: Any) -> Any:
+        if name in kwargs:
+            return kwargs[name]
+        parameter = parameters.get(name)
+        return default if parameter is None or parameter.default is parameter.empty else parameter.default
+
+    return argument("rowSpan", Small), argument("colSpan", 1), argument("mode", ColumnWise)
+
+
+def _installSizedMethods(cls: type):
+    """Generate the add[Small|Medium|Large]X methods of the addX methods defined in a panel class.
+
+    The methods that are explicitly defined in the class are kept.
+
+    :param cls: The panel class.
+    """
+    for name in list(vars(cls)):
+        if not re.match(r"add[A-Z]", name) or _sizedMethodPattern.match(name):
+            continue
+        if not _acceptsRowSpan(getattr(cls, name)):
+            continue
+        for style in RibbonButtonStyle:
+            sizedName = f"add{style.name}{name[3:]}"
+            if sizedName not in vars(cls):
+                setattr(cls, sizedName, functools.partialmethod(getattr(cls, name), rowSpan=style))
+
 
 class RibbonPanelItemWidget(QFrame):
     """Widget to display a panel item."""
@@ -141,12 +569,228 @@ class RibbonPanelItemWidget(QFrame):
         self.layout().addWidget(widget)
 
 
+def _resetItem(item: RibbonPanelItemWidget) -> bool:
+    """Reset a panel item, only the items whose widget is removed can be pooled."""
+    return item.layout().count() == 0
+
+
+RibbonWidgetPool.registerResetter(RibbonPanelItemWidget, _resetItem)
+
+
+class RibbonPanelPlacement(object):
+    """The cells and the layout item of a widget in a panel."""
+
+    __slots__ = ("item", "row", "col", "rowSpan", "colSpan", "mode", "alignment", "fixedHeight", "commandName")
+
+    def __init__(
+        self,
+        rowSpan: int,
+        colSpan: int,
+        mode: RibbonSpaceFindMode,
+        alignment: Qt.AlignmentFlag,
+        fixedHeight: Union[bool, float],
+    ):
+        """Create a new placement, the cells and the item are set when the widget is placed.
+
+        :param rowSpan: The number of rows the widget spans.
+        :param colSpan: The number of columns the widget spans.
+        :param mode: The mode to find spaces.
+        :param alignment: The alignment of the widget.
+        :param fixedHeight: Whether to fix the height of the widget, see RibbonPanel.addWidget().
+        """
+        self.item = None  # type: Optional[QWidget]
+        self.row = -1
+        self.col = -1
+        self.rowSpan = rowSpan
+        self.colSpan = colSpan
+        self.mode = mode
+        self.alignment = alignment
+        self.fixedHeight = fixedHeight
+        # the name the widget is registered under in the command registry, kept if the widget is renamed
+        self.commandName = ""
+
+
 class RibbonPanelOptionButton(QToolButton):
     """Button to display the options of a panel."""
 
     pass
 
 
+class RibbonPanelCollapsedButton(RibbonToolButton):
+    """Button showing a collapsed panel, it pops up the widgets of the panel when it is clicked."""
+
+    pass
+
+
+class RibbonPanelPopup(QFrame):
+    """Popup showing the widgets of a collapsed panel."""
+
+    def __init__(self, parent=None):
+        """Create a new panel popup.
+
+        :param parent: The parent widget.
+        """
+        super().__init__(parent, Qt.WindowType.Popup)
+        self._gridLayout = QGridLayout(self)
+        self._gridLayout.setContentsMargins(5, 5, 5, 5)
+        self._gridLayout.setSpacing(0)
+
+    def gridLayout(self) -> QGridLayout:
+        """Return the grid layout of the popup.
+
+        :return: The grid layout.
+        """
+        return self._gridLayout
+
+
+def _freezeSpec(data: Mapping[str, Mapping]) -> Tuple:
+    """Return a hashable key of the contents of widget specs.
+
+    Only the specs whose args and kwargs hold immutable values have a key, a cached spec must not share a list or a
+    dict with the caller that compiled it, the values would change with the caller's.
+
+    :param data: The widget specs, of the form accepted by RibbonPanel.addWidgetsBy().
+    :return: The key.
+    :raises TypeError: If the specs hold a mutable or unhashable value.
+    """
+    key = []
+    for name, widget_data in data.items():
+        if not isinstance(widget_data, Mapping):
+            raise TypeError(f"The spec of the widget {name} is not a mapping")
+        kwargs = widget_data.get("kwargs", widget_data.get("arguments", {}))
+        if not isinstance(kwargs, Mapping):
+            raise TypeError(f"The kwargs of the widget {name} is not a mapping")
+        key.append(
+            (
+                name,
+                _freezeValue(widget_data.get("type", "")),
+                tuple(_freezeValue(arg) for arg in widget_data.get("args", ())),
+                tuple((argName, _freezeValue(arg)) for argName, arg in kwargs.items()),
+            )
+        )
+    key = tuple(key)
+    hash(key)
+    return key
+
+
+def _freezeValue(value: Any) -> Any:
+    """Return a hashable key of an argument of a widget spec, the type of the value is part of the key.
+
+    :param value: The argument.
+    :return: The key.
+    :raises TypeError: If the value is a list, a dict, a set or a bytearray.
+    """
+    if isinstance(value, tuple):
+        return type(value), tuple(_freezeValue(item) for item in value)
+    if isinstance(value, (list, dict, set, bytearray)):
+        raise TypeError(f"Mutable value of type {type(value).__name__}")
+    return type(value), value
+
+
+class RibbonWidgetsSpec(object):
+    """Widget specs of RibbonPanel.addWidgetsBy() compiled once, so that they can be replayed into any number of
+    panels.
+
+    The type, args and kwargs of each widget are read and checked when the spec is compiled, the data is not
+    modified and the compiled spec is immutable. The add methods are resolved once per panel class, and the cells
+    they request only when the widgets are added lazily.
+    """
+
+    __slots__ = ("_entries", "_methods", "_spans")
+
+    #: compiled specs of the dictionaries passed to RibbonPanel.addWidgetsBy(), by their contents
+    _cache = collections.OrderedDict()  # type: collections.OrderedDict[Any, RibbonWidgetsSpec]
+    _cacheSize = 128
+
+    def __init__(self, data: Mapping[str, Mapping]):
+        """Compile widget specs.
+
+        :param data: The widget specs, of the form accepted by RibbonPanel.addWidgetsBy().
+        """
+        entries = []
+        for key, widget_data in data.items():
+            type = widget_data.get("type", "")
+            assert isinstance(type, str), f"The type of the widget {key} is not a string"
+            args = widget_data.get("args", ())
+            kwargs = widget_data.get("kwargs", widget_data.get("arguments", {}))
+            assert isinstance(kwargs, Mapping), f"The kwargs of the widget {key} is not a mapping"
+            # capitalize() would turn ComboBox into Combobox
+            entries.append((key, f"add{type[:1].upper()}{type[1:]}", tuple(args), MappingProxyType(dict(kwargs))))
+        self._entries = tuple(entries)  # type: Tuple[Tuple[str, str, Tuple, Mapping[str, Any]], ...]
+        # unbound add method of each widget by panel class, None if the method is only set on panel instances
+        self._methods = {}  # type: Dict[type, Tuple[Optional[Callable], ...]]
+        # spans requested by each widget by panel class, resolved for the lazy widgets only
+        self._spans = {}  # type: Dict[type, Tuple[Optional[Tuple], ...]]
+
+    @classmethod
+    def compile(cls, data: Mapping[str, Mapping]) -> RibbonWidgetsSpec:
+        """Return the compiled spec of widget specs, the specs with the same contents are compiled once.
+
+        The last compiled specs are cached by their contents, the specs whose args or kwargs hold mutable values,
+        such as lists, or values that are not hashable are compiled every time.
+
+        :param data: The widget specs, of the form accepted by RibbonPanel.addWidgetsBy().
+        :return: The compiled spec.
+        """
+        try:
+            key = _freezeSpec(data)
+            spec = cls._cache.get(key)
+        except TypeError:
+            return cls(data)
+        if spec is None:
+            spec = cls._cache[key] = cls(data)
+            if len(cls._cache) > cls._cacheSize:
+                cls._cache.popitem(last=False)
+        else:
+            cls._cache.move_to_end(key)
+        return spec
+
+    def __len__(self) -> int:
+        """Return the number of widgets."""
+        return len(self._entries)
+
+    def keys(self) -> List[str]:
+        """Return the keys of the widgets.
+
+        :return: The keys, in the order of the specs.
+        """
+        return [key for key, *_ in self._entries]
+
+    def entries(self) -> Tuple[Tuple[str, str, Tuple, Mapping[str, Any]], ...]:
+        """Return the compiled widget specs.
+
+        :return: The key, name of the add method, args and kwargs of each widget.
+        """
+        return self._entries
+
+    def methods(self, cls: type) -> Tuple[Optional[Callable], ...]:
+        """Return the add methods of the widgets resolved on a panel class.
+
+        :param cls: The panel class.
+        :return: The unbound add method of each widget, None if the class has no such method.
+        """
+        methods = self._methods.get(cls)
+        if methods is None:
+            resolved = (getattr(cls, name, None) for _, name, _, _ in self._entries)
+            methods = self._methods[cls] = tuple(method if callable(method) else None for method in resolved)
+        return methods
+
+    def spans(self, cls: type) -> Tuple[Optional[Tuple], ...]:
+        """Return the cells requested by the widgets resolved on a panel class, from their kwargs or the defaults
+        of their add methods.
+
+        :param cls: The panel class.
+        :return: The rowSpan, colSpan and mode of each widget, None if the class has no add method for it.
+        """
+        spans = self._spans.get(cls)
+        if spans is None:
+            spans = self._spans[cls] = tuple(
+                _specSpans(method, kwargs) if method is not None else None
+                for method, (_, _, _, kwargs) in zip(self.methods(cls), self._entries)
+            )
+        return spans
+
+
 class RibbonPanel(QFrame):
     """Panel in the ribbon category."""
 
@@ -162,9 +806,41 @@ class RibbonPanel(QFrame):
     _gridLayoutManager: RibbonGridLayoutManager
     #: whether to show the panel option button
     _showPanelOptionButton: bool
+    #: whether the widgets are put directly into the grid layout instead of being wrapped in an item widget
+    _flatLayout: bool = False
 
     #: widgets that are added to the panel
     _widgets: List[QWidget] = []
+    #: placements of the widgets that are added to the panel
+    _placements: Dict[QWidget, RibbonPanelPlacement]
+    #: widgets waiting to be placed by a batch, None if no batch is in progress
+    _pendingWidgets: Optional[List[Tuple[QWidget, Dict[str, Any]]]] = None
+    #: widgets added lazily and waiting to be constructed, as (widgets, key, method, args, kwargs, cells)
+    _lazyWidgets: List[Tuple[Dict[str, QWidget], str, Callable, tuple, dict, Tuple[int, int, int, int]]]
+    #: cells reserved for the widgets being constructed, as {widget: (row, col, rowSpan, colSpan)}
+    _reservedCells: Optional[Dict[QWidget, Tuple[int, int, int, int]]] = None
+    #: keyword arguments of addWidget() that control the placement of a widget
+    _placementKeys = ("rowSpan", "colSpan", "mode", "alignment", "fixedHeight")
+    #: cached panel height, row height and maximum button height, None if they have to be computed
+    _rowMetrics: Optional[Tuple[int, int, int]] = None
+    #: reduction stage of the panel
+    _stage: RibbonPanelStage = RibbonPanelStage.Large
+    #: widths of the panel at the reduction stages, computed once until the widgets change
+    _stageWidths: Dict[RibbonPanelStage, int]
+    #: width hints of the layout items of the buttons at the button styles, as {button: {buttonStyle: width}}
+    _itemWidths: Dict[QWidget, Dict[RibbonButtonStyle, int]]
+    #: original styles of the buttons reduced by the stages, as {button: (buttonStyle, toolButtonStyle)}
+    _buttonStyles: Dict[RibbonToolButton, Tuple[RibbonButtonStyle, Qt.ToolButtonStyle]]
+    #: button and popup showing the panel when it is collapsed, created when the panel is collapsed first
+    _collapsedButton: Optional[RibbonPanelCollapsedButton] = None
+    _popup: Optional[RibbonPanelPopup] = None
+    #: registry of the named widgets of the ribbon, and the title of the category of the panel
+    _commandRegistry: Optional[RibbonCommandRegistry] = None
+    _categoryTitle: str = ""
+    #: pool of the widgets released from the panel, and reused by the panel
+    _widgetPool: Optional[RibbonWidgetPool] = None
+    #: depth of the nested batch update contexts
+    _batchUpdateDepth: int = 0
 
     # height of the title widget
     _titleHeight: int = 15
@@ -211,6 +887,11 @@ class RibbonPanel(QFrame):
         self._smallRows = max(round(maxRows / 3), 1)
         self._gridLayoutManager = RibbonGridLayoutManager(self._maxRows)
         self._widgets = []
+        self._placements = {}
+        self._lazyWidgets = []
+        self._stageWidths = {}
+        self._itemWidths = {}
+        self._buttonStyles = {}
         self._showPanelOptionButton = showPanelOptionButton
 
         # Main layout
@@ -341,12 +1022,27 @@ class RibbonPanel(QFrame):
         self._panelOption.setToolTip(text)
 
     def rowHeight(self) -> int:
-        """Return the height of a row."""
-        return int(
+        """Return the height of a row.
+
+        :return: The height of a row at the current height of the panel.
+        """
+        return self._rowMetricsAt(self.height())[1]
+
+    def _rowMetricsAt(self, height: int) -> Tuple[int, int, int]:
+        """Return the panel height, the row height and the maximum button height at a panel height, the cached
+        metrics are returned if they were computed at this height. The widgets are not changed.
+
+        :param height: The height of the panel.
+        :return: The panel height, the row height and the maximum button height.
+        """
+        if self._rowMetrics is not None and self._rowMetrics[0] == height:
+            return self._rowMetrics
+        margins = self._mainLayout.contentsMargins()
+        rowHeight = int(
             (
-                self.size().height()
-                - self._mainLayout.contentsMargins().top()
-                - self._mainLayout.contentsMargins().bottom()
+                height
+                - margins.top()
+                - margins.bottom()
                 - self._mainLayout.spacing()
                 - self._titleWidget.height()
                 - self._actionsLayout.contentsMargins().top()
@@ -356,13 +1052,75 @@ class RibbonPanel(QFrame):
             )
             / self._gridLayoutManager.rows
         )
+        buttonHeight = (
+            height
+            - self._titleLabel.sizeHint().height()
+            - self._mainLayout.spacing()
+            - margins.top()
+            - margins.bottom()
+        )
+        return height, rowHeight, buttonHeight
+
+    def _updateRowMetrics(self) -> Tuple[int, int, int]:
+        """Cache the row metrics at the current height of the panel and return them, see _rowMetricsAt().
+
+        When the metrics change, the height constraints of the widgets already in the panel are re-applied in one
+        pass. It is called when the widgets are added, and when the panel is resized or its style changes.
+
+        :return: The panel height, the row height and the maximum button height.
+        """
+        metrics = self._rowMetricsAt(self.height())
+        if metrics is self._rowMetrics:
+            return metrics
+        self._rowMetrics = metrics
+        _, rowHeight, buttonHeight = metrics
+        if self._placements:
+            with suspendUpdates(self):
+                for widget, placement in self._placements.items():
+                    self._constrainHeight(widget, placement, rowHeight, buttonHeight)
+            self._invalidateStages()
+        return metrics
+
+    def resizeEvent(self, a0: QResizeEvent):
+        """Update the row metrics and the height of the widgets when the height of the panel changes."""
+        super().resizeEvent(a0)
+        if a0.size().height() != a0.oldSize().height():
+            self._updateRowMetrics()
+
+    def changeEvent(self, a0: QEvent):
+        """Update the row metrics and the height of the widgets when the style or the font of the panel changes."""
+        super().changeEvent(a0)
+        if a0.type() in (QEvent.Type.StyleChange, QEvent.Type.FontChange):
+            self._rowMetrics = None
+            self._updateRowMetrics()
+
+    def flatLayout(self) -> bool:
+        """Return whether the widgets are put directly into the grid layout of the panel.
+
+        :return: Whether the flat layout is used.
+        """
+        return self._flatLayout
+
+    def setFlatLayout(self, flat: bool):
+        """Set whether the widgets added afterwards are put directly into the grid layout of the panel, instead of
+        being wrapped in a RibbonPanelItemWidget. The widgets keep their alignment and height constraints, and the
+        panel creates half as many widgets and nested layouts.
+
+        :param flat: Whether to use the flat layout.
+        """
+        self._flatLayout = flat
 
     def setTitle(self, title: str):
         """Set the title of the panel.
 
         :param title: The title to set.
         """
+        registry, category = self._commandRegistry, self._categoryTitle
+        self._setCommandRegistry(None, "")
         self._titleLabel.setText(title)
+        self._setCommandRegistry(registry, category)
+        if self._collapsedButton is not None:
+            self._collapsedButton.setText(title)
 
     def title(self):
         """Get the title of the panel.
@@ -379,6 +1137,8 @@ class RibbonPanel(QFrame):
         self._titleHeight = height
         self._titleWidget.setFixedHeight(height)
         self._panelOption.setIconSize(QSize(height, height))
+        self._rowMetrics = None
+        self._updateRowMetrics()
 
     def titleHeight(self) -> int:
         """Get the height of the title widget.
@@ -387,7 +1147,23 @@ class RibbonPanel(QFrame):
         """
         return self._titleHeight
 
-    def addWidgetsBy(self, data: Dict[str, Dict]) -> Dict[str, QWidget]:
+    @contextlib.contextmanager
+    def batchUpdate(self):
+        """Suspend the repaint and the layout of the panel in the context. The widgets added in the context are
+        placed at once, then the panel is laid out and repainted once on exit. The contexts can be nested.
+
+        .. code-block:: python
+
+            with panel.batchUpdate():
+                panel.addSmallButton("Button 1")
+                panel.addSmallButton("Button 2")
+        """
+        with suspendUpdates(self, self._mainLayout), self._deferPlacement():
+            yield
+
+    def addWidgetsBy(
+        self, data: Union[Dict[str, Dict], RibbonWidgetsSpec], lazy: bool = False
+    ) -> Dict[str, QWidget]:
         """Add widgets to the panel.
 
         :param data: The data to add. The dict is of the form:
@@ -410,20 +1186,182 @@ class RibbonPanel(QFrame):
             LineEdit, TextEdit, PlainTextEdit, Label, ProgressBar, SpinBox, DoubleSpinBox, DataEdit, TimeEdit,
             DateTimeEdit, TableWidget, TreeWidget, ListWidget, CalendarWidget, Separator, HorizontalSeparator,
             VerticalSeparator, Gallery.
+
+            The keys are used as the object names of the widgets that have none, the named widgets of a panel in a
+            ribbon can be looked up with RibbonBar.command().
+
+            The data is not modified, it is compiled with RibbonWidgetsSpec.compile(), so the dictionaries with the
+            same contents are compiled once. To add the same widgets to several panels, the data can also be
+            compiled once with RibbonWidgetsSpec(data) and the compiled spec passed instead.
+        :param lazy: Whether to construct the widgets lazily. The cells of the widgets are reserved at once, but the
+                     widgets are only constructed when the panel is shown for the first time or when materialize()
+                     is called, the returned dictionary is filled at that time.
         :return: A dictionary of the added widgets.
         """
+        spec = data if isinstance(data, RibbonWidgetsSpec) else RibbonWidgetsSpec.compile(data)
         widgets = {}  # type: Dict[str, QWidget]
-        for key, widget_data in data.items():
-            type = widget_data.pop("type", "").capitalize()
-            method = getattr(self, f"add{type}", None)  # type: Callable
-            assert callable(
-                method
-            ), f"Method add{type} is not callable or does not exist"
-            args = widget_data.get("args", ())
-            kwargs = widget_data.get("kwargs", widget_data.get("arguments", {}))
-            widgets[key] = method(*args, **kwargs)
+        lazyWidgets = []
+        methods = spec.methods(type(self))
+        specSpans = spec.spans(type(self)) if lazy else None
+        with contextlib.nullcontext() if lazy else self.batchUpdate():
+            for index, (key, name, args, kwargs) in enumerate(spec.entries()):
+                if methods[index] is not None:
+                    method = functools.partial(methods[index], self)
+                else:  # an add method set on the panel instance
+                    method = getattr(self, name, None)  # type: Callable
+                    assert callable(method), f"Method {name} is not callable or does not exist"
+                if lazy:
+                    spans = specSpans[index] if methods[index] is not None else _specSpans(method, kwargs)
+                    rowSpan, colSpan, mode = spans
+                    lazyWidgets.append((key, method, args, kwargs, (self.defaultRowSpan(rowSpan), colSpan, mode)))
+                else:
+                    widgets[key] = self._nameWidget(method(*args, **kwargs), key)
+        if lazyWidgets:
+            self._flushPendingWidgets()
+            positions = self._gridLayoutManager.request_many(spans for *_, spans in lazyWidgets)
+            self._lazyWidgets.extend(
+                (widgets, key, method, args, kwargs, (row, col, spans[0], spans[1]))
+                for (key, method, args, kwargs, spans), (row, col) in zip(lazyWidgets, positions)
+            )
         return widgets
 
+    @staticmethod
+    def _nameWidget(widget: QWidget, name: str) -> QWidget:
+        """Use the key of a widget spec as the object name of the widget, unless it already has one.
+
+        :param widget: The widget.
+        :param name: The key of the spec.
+        :return: The widget.
+        """
+        if isinstance(widget, QWidget) and not widget.objectName():
+            widget.setObjectName(name)
+        return widget
+
+    def materialize(self):
+        """Construct the widgets added lazily by addWidgetsBy() in the cells reserved for them.
+
+        It is called when the panel is shown for the first time, nothing happens if there is no widget to construct.
+        """
+        if not self._lazyWidgets:
+            return
+        lazyWidgets, self._lazyWidgets = self._lazyWidgets, []
+        pending, self._pendingWidgets = self._pendingWidgets, []
+        self._reservedCells = {}
+        try:
+            with suspendUpdates(self, self._mainLayout):
+                for widgets, key, method, args, kwargs, cells in lazyWidgets:
+                    widget = self._nameWidget(method(*args, **kwargs), key)
+                    widgets[key] = widget
+                    self._reservedCells[widget] = cells
+                created, self._pendingWidgets = self._pendingWidgets, None
+                self.addWidgets(created)
+        finally:
+            for row, col, _, _ in self._reservedCells.values():
+                self._gridLayoutManager.release_cells(row, col)
+            self._reservedCells = None
+            self._pendingWidgets = pending
+
+    def showEvent(self, a0: QShowEvent):
+        """Construct the widgets added lazily when the panel is shown for the first time."""
+        self.materialize()
+        super().showEvent(a0)
+
+    @contextlib.contextmanager
+    def _deferPlacement(self):
+        """Collect the widgets added in the context and place them with a single addWidgets() call on exit."""
+        if self._pendingWidgets is not None:
+            yield
+            return
+        self._pendingWidgets = []
+        try:
+            yield
+        finally:
+            pending, self._pendingWidgets = self._pendingWidgets, None
+            self.addWidgets(pending)
+
+    def _flushPendingWidgets(self):
+        """Place the widgets waiting in the current batch, so that the cells requested next come after theirs."""
+        if self._pendingWidgets:
+            pending, self._pendingWidgets = self._pendingWidgets, None
+            try:
+                self.addWidgets(pending)
+            finally:
+                self._pendingWidgets = []
+
+    def _constrainHeight(
+        self,
+        widget: QWidget,
+        placement: RibbonPanelPlacement,
+        rowHeight: int,
+        buttonHeight: int,
+        rowSpan: Optional[int] = None,
+    ):
+        """Constrain the height of a widget to the rows it spans.
+
+        :param widget: The widget to constrain.
+        :param placement: The placement of the widget.
+        :param rowHeight: The height of a row.
+        :param buttonHeight: The maximum height of a button.
+        :param rowSpan: The number of rows the widget spans at the current stage, defaults to the placement's.
+        """
+        rowSpan = placement.rowSpan if rowSpan is None else rowSpan
+        fixedHeight = placement.fixedHeight
+        maximumHeight = (
+            rowHeight * rowSpan
+            + self._actionsLayout.verticalSpacing() * (rowSpan - 2)
+        )
+        widget.setMaximumHeight(maximumHeight)
+        if fixedHeight is True or fixedHeight > 0:
+            fixedHeight = (
+                int(fixedHeight * maximumHeight)
+                if 0 < fixedHeight <= 1
+                else fixedHeight if 1 < fixedHeight < maximumHeight else maximumHeight
+            )
+            fixedHeight = max(
+                fixedHeight, 0.4 * maximumHeight
+            )  # minimum height is 40% of the maximum height
+            widget.setFixedHeight(fixedHeight)
+        if isinstance(widget, RibbonToolButton) and widget.buttonStyle() == Large:
+            self._fitIconSize(widget, buttonHeight)
+
+    @staticmethod
+    def _fitIconSize(button: RibbonToolButton, buttonHeight: int):
+        """Fit the maximum icon size of a large button to the maximum height of a button.
+
+        :param button: The large button.
+        :param buttonHeight: The maximum height of a button.
+        """
+        fontSize = max(button.font().pointSize() * 4 / 3, button.font().pixelSize())
+        arrowSize = fontSize
+        maximumIconSize = int(max(buttonHeight - fontSize * 2 - arrowSize, 48))
+        if maximumIconSize != button.maximumIconSize():
+            button.setMaximumIconSize(maximumIconSize)
+
+    def _placeWidget(self, widget: QWidget, placement: RibbonPanelPlacement, rowHeight: int, buttonHeight: int):
+        """Constrain the height of a widget and put it into its cells of the actions layout.
+
+        :param widget: The widget to place.
+        :param placement: The placement of the widget, its cells must have been requested.
+        :param rowHeight: The height of a row.
+        :param buttonHeight: The maximum height of a button.
+        """
+        self._constrainHeight(widget, placement, rowHeight, buttonHeight)
+        if self._flatLayout:
+            item = widget
+        else:
+            pool = self._widgetPool
+            item = pool.acquire(RibbonPanelItemWidget, parent=self) if pool is not None else None
+            item = item or RibbonPanelItemWidget(self)
+            item.addWidget(widget)
+        placement.item = item
+        self._placements[widget] = placement
+        placement.commandName = widget.objectName()
+        if self._commandRegistry is not None and placement.commandName:
+            self._commandRegistry.register(self._categoryTitle, self.title(), placement.commandName, widget)
+        self._actionsLayout.addWidget(
+            item, placement.row, placement.col, placement.rowSpan, placement.colSpan, placement.alignment
+        )  # type: ignore
+
     def addWidget(
         self,
         widget: QWidget,
@@ -448,36 +1386,387 @@ class RibbonPanel(QFrame):
                             minimum height is 40% of the maximum height allowed.
         :return: The added widget.
         """
-        rowSpan = self.defaultRowSpan(rowSpan)
-        self._widgets.append(widget)
-        row, col = self._gridLayoutManager.request_cells(rowSpan, colSpan, mode)
-        maximumHeight = (
-            self.rowHeight() * rowSpan
-            + self._actionsLayout.verticalSpacing() * (rowSpan - 2)
-        )
-        widget.setMaximumHeight(maximumHeight)
-        if fixedHeight is True or fixedHeight > 0:
-            fixedHeight = (
-                int(fixedHeight * maximumHeight)
-                if 0 < fixedHeight <= 1
-                else fixedHeight if 1 < fixedHeight < maximumHeight else maximumHeight
+        if self._pendingWidgets is not None:
+            self._pendingWidgets.append(
+                (
+                    widget,
+                    dict(rowSpan=rowSpan, colSpan=colSpan, mode=mode, alignment=alignment, fixedHeight=fixedHeight),
+                )
             )
-            fixedHeight = max(
-                fixedHeight, 0.4 * maximumHeight
-            )  # minimum height is 40% of the maximum height
-            widget.setFixedHeight(fixedHeight)
-        item = RibbonPanelItemWidget(self)
-        item.addWidget(widget)
-        self._actionsLayout.addWidget(item, row, col, rowSpan, colSpan, alignment)  # type: ignore
+            return widget
+        placement = RibbonPanelPlacement(self.defaultRowSpan(rowSpan), colSpan, mode, alignment, fixedHeight)
+        placement.row, placement.col = self._gridLayoutManager.request_cells(placement.rowSpan, colSpan, mode)
+        self._widgets.append(widget)
+        _, rowHeight, buttonHeight = self._updateRowMetrics()
+        self._placeWidget(widget, placement, rowHeight, buttonHeight)
+        self._invalidateStages()
         return widget
 
+    def addWidgets(self, widgets: Iterable[Union[QWidget, Tuple[QWidget, Dict[str, Any]]]]) -> List[QWidget]:
+        """Add a batch of widgets to the panel.
+
+        The cells of all the widgets are requested at once, the row height is computed once, and the widgets are
+        inserted into the layout while the updates of the panel are disabled.
+
+        :param widgets: The widgets to add, each of them is either a widget or a tuple of the widget and a dict of
+                        the keyword arguments accepted by addWidget(), i.e. rowSpan, colSpan, mode, alignment and
+                        fixedHeight.
+        :return: The added widgets.
+        """
+        items = []  # type: List[Tuple[QWidget, RibbonPanelPlacement]]
+        for widget in widgets:
+            widget, kwargs = widget if isinstance(widget, tuple) else (widget, {})
+            placement = RibbonPanelPlacement(
+                self.defaultRowSpan(kwargs.get("rowSpan", Small)),
+                kwargs.get("colSpan", 1),
+                kwargs.get("mode", ColumnWise),
+                kwargs.get("alignment", Qt.AlignmentFlag.AlignCenter),
+                kwargs.get("fixedHeight", False),
+            )
+            items.append((widget, placement))
+        if self._pendingWidgets is not None:
+            self._pendingWidgets.extend(
+                (widget, {key: getattr(placement, key) for key in self._placementKeys}) for widget, placement in items
+            )
+            return [widget for widget, _ in items]
+        if self._reservedCells:
+            positions = self._takeReservedCells(items)
+        else:
+            positions = self._gridLayoutManager.request_many(
+                (placement.rowSpan, placement.colSpan, placement.mode) for _, placement in items
+            )
+        _, rowHeight, buttonHeight = self._updateRowMetrics()
+        with suspendUpdates(self, self._mainLayout):
+            for (widget, placement), (placement.row, placement.col) in zip(items, positions):
+                self._widgets.append(widget)
+                self._placeWidget(widget, placement, rowHeight, buttonHeight)
+        self._invalidateStages()
+        return [widget for widget, _ in items]
+
+    def _takeReservedCells(self, items: List[Tuple[QWidget, RibbonPanelPlacement]]) -> List[Tuple[int, int]]:
+        """Return the cells of the widgets being constructed by materialize(), the cells reserved for a widget are
+        used if they fit its placement, otherwise new cells are requested.
+
+        :param items: The widgets and their placements.
+        :return: The row and column of each widget.
+        """
+        reserved = []  # type: List[Optional[Tuple[int, int]]]
+        for widget, placement in items:
+            cells = self._reservedCells.pop(widget, None)
+            if cells is not None and cells[2:] != (placement.rowSpan, placement.colSpan):
+                self._gridLayoutManager.release_cells(cells[0], cells[1])
+                cells = None
+            reserved.append(cells[:2] if cells is not None else None)
+        requested = iter(
+            self._gridLayoutManager.request_many(
+                (placement.rowSpan, placement.colSpan, placement.mode)
+                for (_, placement), cells in zip(items, reserved)
+                if cells is None
+            )
+        )
+        return [cells if cells is not None else next(requested) for cells in reserved]
+
     addSmallWidget = functools.partialmethod(addWidget, rowSpan=Small)
     addMediumWidget = functools.partialmethod(addWidget, rowSpan=Medium)
     addLargeWidget = functools.partialmethod(addWidget, rowSpan=Large)
 
     def removeWidget(self, widget: QWidget):
-        """Remove a widget from the panel."""
-        self._actionsLayout.removeWidget(widget)
+        """Remove a widget from the panel.
+
+        The cells of the widget are released so that they can be used by the widgets added later, and the item
+        wrapping the widget is deleted. The widget itself is not deleted, it is detached from the panel.
+
+        :param widget: The widget to remove.
+        """
+        if self._pendingWidgets is not None:
+            self._pendingWidgets = [pending for pending in self._pendingWidgets if pending[0] is not widget]
+        placement = self._placements.pop(widget, None)
+        if placement is None:
+            self._actionsLayout.removeWidget(widget)
+            if widget in self._widgets:
+                self._widgets.remove(widget)
+            return
+        self._widgets.remove(widget)
+        if self._commandRegistry is not None and placement.commandName:
+            self._commandRegistry.unregister(self._categoryTitle, self.title(), placement.commandName, widget)
+        self._gridLayoutManager.release_cells(placement.row, placement.col)
+        self._actionsLayout.removeWidget(placement.item)
+        if self._popup is not None:
+            self._popup.gridLayout().removeWidget(placement.item)
+        if widget in self._buttonStyles:
+            self._setButtonStyle(widget, *self._buttonStyles.pop(widget))
+        widget.setParent(None)  # type: ignore
+        if placement.item is not widget:
+            placement.item.setParent(None)  # type: ignore
+            if self._widgetPool is None or not self._widgetPool.release(placement.item):
+                placement.item.deleteLater()
+        self._invalidateStages()
+
+    def clear(self):
+        """Remove all the widgets from the panel.
+
+        The widgets are released to the widget pool of the panel to be reused by the panels of the ribbon, the
+        widgets that are not pooled are deleted. The widgets added lazily are dropped without being constructed.
+        """
+        for *_, (row, col, _, _) in self._lazyWidgets:
+            self._gridLayoutManager.release_cells(row, col)
+        self._lazyWidgets = []
+        pending = [widget for widget, _ in self._pendingWidgets or []]
+        with suspendUpdates(self, self._mainLayout):
+            for widget in list(self._widgets) + pending:
+                self.removeWidget(widget)
+                widget.setParent(None)  # type: ignore
+                if self._widgetPool is None or not self._widgetPool.release(widget):
+                    widget.deleteLater()
+
+    def widgetPool(self) -> Optional[RibbonWidgetPool]:
+        """Return the pool the widgets released from the panel are recycled to.
+
+        :return: The widget pool, None if the widgets are not recycled.
+        """
+        return self._widgetPool
+
+    def setWidgetPool(self, pool: Optional[RibbonWidgetPool]):
+        """Set the pool the widgets released from the panel are recycled to, the buttons and items added to the
+        panel are taken from the pool when possible. The panels of a ribbon share the pool of the ribbon.
+
+        :param pool: The widget pool, None to not recycle the widgets.
+        """
+        self._widgetPool = pool
+
+    def compact(self):
+        """Repack the widgets of the panel, in the order they were added, to fill the holes left by removed
+        widgets. The widgets are moved in a single layout pass, the widgets added lazily are constructed first.
+        """
+        self.materialize()
+        placements = [self._placements[widget] for widget in self._widgets if widget in self._placements]
+        manager = RibbonGridLayoutManager(self._gridLayoutManager.rows)
+        positions = manager.request_many(
+            (placement.rowSpan, placement.colSpan, placement.mode) for placement in placements
+        )
+        self._gridLayoutManager = manager
+        for placement, (row, col) in zip(placements, positions):
+            placement.row, placement.col = row, col
+        self._stageWidths = {}
+        self._applyStage(self._stage)
+
+    def _setCommandRegistry(self, registry: Optional[RibbonCommandRegistry], category: str):
+        """Move the named widgets of the panel to a command registry.
+
+        :param registry: The registry of the ribbon, None to unregister the widgets.
+        :param category: The title of the category of the panel.
+        """
+        if self._commandRegistry is not None:
+            for widget, placement in self._placements.items():
+                if placement.commandName:
+                    self._commandRegistry.unregister(self._categoryTitle, self.title(), placement.commandName, widget)
+        self._commandRegistry, self._categoryTitle = registry, category
+        for widget, placement in self._placements.items():
+            placement.commandName = widget.objectName()
+            if registry is not None and placement.commandName:
+                registry.register(category, self.title(), placement.commandName, widget)
+
+    def stage(self) -> RibbonPanelStage:
+        """Return the reduction stage of the panel.
+
+        :return: The reduction stage.
+        """
+        return self._stage
+
+    def setStage(self, stage: RibbonPanelStage):
+        """Set the reduction stage of the panel. At the Medium and Small stages, the larger buttons are reduced to
+        medium or small buttons and the widgets are packed again, at the Collapsed stage, the panel is shown as a
+        single button that pops up the widgets.
+
+        :param stage: The reduction stage.
+        """
+        if stage != self._stage:
+            self._applyStage(stage)
+
+    def stageWidth(self, stage: RibbonPanelStage) -> int:
+        """Return the width of the panel at a reduction stage.
+
+        The width is computed from the size hints of the widgets at the button styles of the stage, the widgets are
+        not laid out at the stage. The widths are cached until the widgets of the panel change, the widgets of a
+        lazy panel that are not constructed yet are not taken into account.
+
+        :param stage: The reduction stage.
+        :return: The width of the panel.
+        """
+        if stage not in self._stageWidths:
+            margins = self._mainLayout.contentsMargins()
+            actionsMargins = self._actionsLayout.contentsMargins()
+            if stage == RibbonPanelStage.Collapsed:
+                titleWidth = 0
+                actionsWidth = self._panelCollapsedButton().sizeHint().width()
+            else:
+                titleWidth = self._titleWidget.sizeHint().width()
+                actionsWidth = self._gridWidth(
+                    (col, placement.colSpan, self._itemWidth(widget, placement, style))
+                    for (widget, placement, style, _), (_, col) in zip(*self._stageCells(stage))
+                )
+            self._stageWidths[stage] = (
+                max(actionsWidth + actionsMargins.left() + actionsMargins.right(), titleWidth)
+                + margins.left()
+                + margins.right()
+                + self.contentsMargins().left()
+                + self.contentsMargins().right()
+            )
+        return self._stageWidths[stage]
+
+    def _itemWidth(self, widget: QWidget, placement: RibbonPanelPlacement, style: Optional[RibbonButtonStyle]) -> int:
+        """Return the width hint of the layout item of a widget, at a button style for the buttons.
+
+        :param widget: The widget.
+        :param placement: The placement of the widget.
+        :param style: The button style, None for the other widgets.
+        :return: The width hint of the item.
+        """
+        widths = self._itemWidths.setdefault(widget, {})
+        if style not in widths:
+            width = placement.item.sizeHint().width()
+            if style is not None and style != widget.buttonStyle():
+                toolButtonStyle = self._buttonStyles.get(widget, (None, widget.toolButtonStyle()))[1]
+                if toolButtonStyle != Qt.ToolButtonStyle.ToolButtonIconOnly:
+                    toolButtonStyle = None
+                width += widget.buttonStyleSizeHint(style, toolButtonStyle).width() - widget.sizeHint().width()
+            widths[style] = width
+        return widths[style]
+
+    def _gridWidth(self, cells: Iterable[Tuple[int, int, int]]) -> int:
+        """Return the width of the actions layout holding items in columns, like QGridLayout, the width an item
+        spanning several columns lacks is added to its last column.
+
+        :param cells: The column, the column span and the width of the items.
+        :return: The width of the layout.
+        """
+        spacing = max(self._actionsLayout.horizontalSpacing(), 0)
+        columns = {}  # type: Dict[int, int]
+        spanning = []
+        for col, colSpan, width in cells:
+            if colSpan == 1:
+                columns[col] = max(columns.get(col, 0), width)
+            else:
+                spanning.append((col, colSpan, width))
+        for col, colSpan, width in spanning:
+            spanned = sum(columns.get(index, 0) for index in range(col, col + colSpan)) + spacing * (colSpan - 1)
+            lacking = width - spanned
+            if lacking > 0:
+                columns[col + colSpan - 1] = columns.get(col + colSpan - 1, 0) + lacking
+        return sum(columns.values()) + spacing * max(len(columns) - 1, 0)
+
+    def _invalidateStages(self):
+        """Forget the widths of the stages, and lay out the widgets again if the panel is reduced."""
+        self._stageWidths = {}
+        self._itemWidths = {}
+        if self._stage != RibbonPanelStage.Large:
+            self._applyStage(self._stage)
+
+    def _stageCells(
+        self, stage: RibbonPanelStage
+    ) -> Tuple[List[Tuple[QWidget, RibbonPanelPlacement, Optional[RibbonButtonStyle], int]], List[Tuple[int, int]]]:
+        """Return the widgets of the panel with their button styles and row spans at a reduction stage, and their
+        cells. At the Medium and Small stages, the larger buttons are reduced and the widgets are packed again.
+
+        :param stage: The reduction stage.
+        :return: The widgets as (widget, placement, buttonStyle, rowSpan), the button style is None for the widgets
+                 that are not buttons, and the cells of the widgets as (row, col).
+        """
+        widgets = []
+        for widget in self._widgets:
+            placement = self._placements.get(widget)
+            if placement is None:
+                continue
+            style, rowSpan = None, placement.rowSpan
+            if isinstance(widget, RibbonToolButton):
+                style = self._buttonStyles.get(widget, (widget.buttonStyle(),))[0]
+                if stage in (RibbonPanelStage.Medium, RibbonPanelStage.Small) and style > RibbonButtonStyle[stage.name]:
+                    style = RibbonButtonStyle[stage.name]
+                    rowSpan = min(rowSpan, self.defaultRowSpan(style))
+            widgets.append((widget, placement, style, rowSpan))
+        if stage in (RibbonPanelStage.Medium, RibbonPanelStage.Small):
+            positions = RibbonGridLayoutManager(self._gridLayoutManager.rows).request_many(
+                (rowSpan, placement.colSpan, placement.mode) for _, placement, _, rowSpan in widgets
+            )
+        else:
+            positions = [(placement.row, placement.col) for _, placement, _, _ in widgets]
+        return widgets, positions
+
+    def _applyStage(self, stage: RibbonPanelStage):
+        """Lay out the widgets of the panel at a reduction stage.
+
+        :param stage: The reduction stage.
+        """
+        self.materialize()
+        _, rowHeight, buttonHeight = self._updateRowMetrics()
+        widgets, positions = self._stageCells(stage)
+        collapsed = stage == RibbonPanelStage.Collapsed
+        layout = self._panelPopup().gridLayout() if collapsed else self._actionsLayout
+        with suspendUpdates(self, self._mainLayout):
+            for (widget, placement, style, rowSpan), (row, col) in zip(widgets, positions):
+                if style is not None:
+                    toolButtonStyle = self._buttonStyles.setdefault(
+                        widget, (widget.buttonStyle(), widget.toolButtonStyle())
+                    )[1]
+                    self._setButtonStyle(widget, style, toolButtonStyle)
+                self._actionsLayout.removeWidget(placement.item)
+                if self._popup is not None:
+                    self._popup.gridLayout().removeWidget(placement.item)
+                self._constrainHeight(widget, placement, rowHeight, buttonHeight, rowSpan)
+                layout.addWidget(
+                    placement.item, row, col, rowSpan, placement.colSpan, placement.alignment
+                )  # type: ignore
+            self._titleWidget.setVisible(not collapsed)
+            if collapsed:
+                button = self._panelCollapsedButton()
+                self._actionsLayout.addWidget(button, 0, 0, self._gridLayoutManager.rows, 1)
+                button.show()
+            elif self._collapsedButton is not None:
+                self._actionsLayout.removeWidget(self._collapsedButton)
+                self._collapsedButton.hide()
+        self._stage = stage
+
+    @staticmethod
+    def _setButtonStyle(button: RibbonToolButton, style: RibbonButtonStyle, toolButtonStyle: Qt.ToolButtonStyle):
+        """Set the style of a button reduced by a stage, the icon-only buttons stay icon-only.
+
+        :param button: The button.
+        :param style: The button style.
+        :param toolButtonStyle: The original tool button style of the button.
+        """
+        if button.buttonStyle() != style:
+            button.setButtonStyle(style)
+        if toolButtonStyle == Qt.ToolButtonStyle.ToolButtonIconOnly:
+            button.setToolButtonStyle(toolButtonStyle)
+
+    def _panelCollapsedButton(self) -> RibbonPanelCollapsedButton:
+        """Return the button showing the collapsed panel, it is created the first time.
+
+        :return: The collapsed button.
+        """
+        if self._collapsedButton is None:
+            self._collapsedButton = RibbonPanelCollapsedButton(self)  # type: ignore
+            self._collapsedButton.setText(self.title())
+            self._collapsedButton.setIcon(QIcon(DataFile("icons/more.png")))
+            self._collapsedButton.setMaximumIconSize(32)
+            self._collapsedButton.clicked.connect(self._showPopup)  # type: ignore
+        return self._collapsedButton
+
+    def _panelPopup(self) -> RibbonPanelPopup:
+        """Return the popup showing the widgets of the collapsed panel, it is created the first time.
+
+        :return: The popup.
+        """
+        if self._popup is None:
+            self._popup = RibbonPanelPopup(self)
+        return self._popup
+
+    def _showPopup(self):
+        """Pop up the widgets of the collapsed panel under the collapsed button."""
+        popup = self._panelPopup()
+        popup.resize(popup.sizeHint().width(), max(popup.sizeHint().height(), self.height()))
+        popup.move(self._collapsedButton.mapToGlobal(QPoint(0, self._collapsedButton.height())))
+        popup.show()
 
     def widget(self, index: int) -> QWidget:
         """Get the widget at the given index.
@@ -527,27 +1816,20 @@ class RibbonPanel(QFrame):
             rowSpan, RibbonButtonStyle
         ), "rowSpan must be an instance of RibbonButtonStyle"
         style = rowSpan
-        button = RibbonToolButton(self)
-        button.setButtonStyle(style)
+        button = self._widgetPool.acquire(RibbonToolButton, style, self) if self._widgetPool is not None else None
+        if button is None:
+            button = RibbonToolButton(self)
+            button.setButtonStyle(style)
         button.setText(text) if text else None
         button.setIcon(icon) if icon else None
         button.clicked.connect(slot) if slot else None  # type: ignore
         button.setShortcut(shortcut) if shortcut else None
         button.setToolTip(tooltip) if tooltip else None
         button.setStatusTip(statusTip) if statusTip else None
-        maximumHeight = (
-            self.height()
-            - self._titleLabel.sizeHint().height()
-            - self._mainLayout.spacing()
-            - self._mainLayout.contentsMargins().top()
-            - self._mainLayout.contentsMargins().bottom()
-        )
-        button.setMaximumHeight(maximumHeight)
+        buttonHeight = self._updateRowMetrics()[2]
+        button.setMaximumHeight(buttonHeight)
         if style == Large:
-            fontSize = max(button.font().pointSize() * 4 / 3, button.font().pixelSize())
-            arrowSize = fontSize
-            maximumIconSize = max(maximumHeight - fontSize * 2 - arrowSize, 48)
-            button.setMaximumIconSize(int(maximumIconSize))
+            self._fitIconSize(button, buttonHeight)
         if not showText:
             button.setToolButtonStyle(Qt.ToolButtonStyle.ToolButtonIconOnly)
         button.setCheckable(checkable)
@@ -613,29 +1895,23 @@ class RibbonPanel(QFrame):
             fixedHeight=fixedHeight,
         )
 
+    def __init_subclass__(cls, **kwargs):
+        """Generate the sized add[Small|Medium|Large]X methods of the addX methods defined in a subclass."""
+        super().__init_subclass__(**kwargs)
+        _installSizedMethods(cls)
+
     def __getattr__(self, method: str) -> Callable:
-        """Get the dynamic method `add[Small|Medium|Large][Widget]`.
+        """Get the dynamic method `add[Small|Medium|Large][Widget]` of an addX method that is set on the panel
+        instance, the sized methods of the class are generated when the class is created.
 
         :param method: The name of the method to get.
         :return: The method of the widget to add.
         """
-        # Match the method name
-        match = re.match(r"add(Small|Medium|Large)(\w+)", method)
-        assert match, "Invalid method name"
-
-        # Get the widget class and the size
-        size = match.group(1)
-        base_method_name = f"add{match.group(2)}"
-        assert hasattr(
-            self, base_method_name
-        ), f"Invalid method name {base_method_name}"
-
-        # Get the base method
-        base_method = getattr(self, base_method_name)
-        rowSpan = Small if size == "Small" else Medium if size == "Medium" else Large
-
-        # Create the new method
-        return functools.partial(base_method, rowSpan=rowSpan)
+        match = _sizedMethodPattern.fullmatch(method)
+        base_method = self.__dict__.get(f"add{match.group(2)}") if match else None
+        if not callable(base_method):
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{method}'")
+        return functools.partial(base_method, rowSpan=RibbonButtonStyle[match.group(1)])
 
     addCheckBox = functools.partialmethod(
         _addAnyWidget, cls=QCheckBox, initializer=QCheckBox.setText
@@ -671,18 +1947,23 @@ class RibbonPanel(QFrame):
     )
 
     def addSeparator(
-        self, orientation=Qt.Orientation.Vertical, width=6, **kwargs
+        self,
+        orientation=Qt.Orientation.Vertical,
+        width=6,
+        *,
+        rowSpan: Union[int, RibbonButtonStyle] = Large,
+        **kwargs,
     ) -> RibbonSeparator:
         """Add a separator to the panel.
 
         :param orientation: The orientation of the separator.
         :param width: The width of the separator.
+        :param rowSpan: The number of rows the separator spans.
         :param kwargs: keyword arguments to control the properties of the widget on the ribbon bar.
 
         :return: The separator.
         """
-        kwargs["rowSpan"] = Large if "rowSpan" not in kwargs else kwargs["rowSpan"]
-        return self.addWidget(RibbonSeparator(orientation, width), **kwargs)
+        return self.addWidget(RibbonSeparator(orientation, width), rowSpan=rowSpan, **kwargs)
 
     addHorizontalSeparator = functools.partialmethod(
         addSeparator, orientation=Qt.Orientation.Horizontal
@@ -692,22 +1973,27 @@ class RibbonPanel(QFrame):
     )
 
     def addGallery(
-        self, minimumWidth=800, popupHideOnClick=False, **kwargs
+        self,
+        minimumWidth=800,
+        popupHideOnClick=False,
+        *,
+        rowSpan: Union[int, RibbonButtonStyle] = Large,
+        **kwargs,
     ) -> RibbonGallery:
         """Add a gallery to the panel.
 
         :param minimumWidth: The minimum width of the gallery.
         :param popupHideOnClick: Whether the gallery popup should be hidden when a user clicks on it.
+        :param rowSpan: The number of rows the gallery spans.
         :param kwargs: keyword arguments to control the properties of the widget on the ribbon bar.
 
         :return: The gallery.
         """
-        kwargs["rowSpan"] = Large if "rowSpan" not in kwargs else kwargs["rowSpan"]
-        rowSpan = self.defaultRowSpan(kwargs["rowSpan"])
+        if not kwargs.get("fixedHeight"):
+            kwargs["fixedHeight"] = True  # the gallery always fills the rows it spans
         gallery = RibbonGallery(minimumWidth, popupHideOnClick, self)
-        maximumHeight = (
-            self.rowHeight() * rowSpan
-            + self._actionsLayout.verticalSpacing() * (rowSpan - 2)
-        )
-        gallery.setFixedHeight(maximumHeight)
-        return self.addWidget(gallery, **kwargs)
+        RibbonProxyStyle.inherit(gallery)
+        return self.addWidget(gallery, rowSpan=rowSpan, **kwargs)
+
+
+_installSizedMethods(RibbonPanel)
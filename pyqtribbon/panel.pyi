@@ -1,9 +1,10 @@
 from __future__ import annotations
 
-from typing import Any, Callable, Dict, Iterable, List, Union, overload
+import collections
+import functools
+from typing import TYPE_CHECKING, Any, Callable, ContextManager, Dict, Iterable, List, Mapping, Optional, Pattern, Set, Tuple, Union, overload
 
-import numpy as np
-from PySide.QtGui import QIcon, QKeySequence
+from PySide.QtGui import QIcon, QKeySequence, QResizeEvent, QShowEvent
 from PySide.QtWidgets import (
     QToolButton,
     QWidget,
@@ -31,32 +32,159 @@ from PySide.QtWidgets import (
 )
 from PySide.QtCore import (
     Qt,
+    QEvent,
+    QPoint,
     Signal,
     QKeyCombination,
 )
 
-from .constants import ColumnWise, Large, RibbonButtonStyle, RibbonSpaceFindMode, Small
+from .constants import (
+    ColumnWise,
+    Large,
+    RibbonButtonStyle,
+    RibbonGridBackend,
+    RibbonPanelStage,
+    RibbonSpaceFindMode,
+    Small,
+)
+from .commands import RibbonCommandRegistry
+from .pool import RibbonWidgetPool
 from .gallery import RibbonGallery
 from .separator import RibbonSeparator
 from .toolbutton import RibbonToolButton
 
+if TYPE_CHECKING:
+    import numpy as np
+
 class RibbonPanelTitle(QLabel): ...
 
+class RibbonGridBitset(object):
+    rows: int
+    _columns: List[int]
+
+    def __init__(self, rows: int, capacity: int): ...
+    def capacity(self) -> int: ...
+    def reserve(self, columns: int): ...
+    def occupied(self, col: int) -> int: ...
+    def setAvailable(self, row: int, col: int, rowSpan: int, colSpan: int, available: bool): ...
+    def cells(self, columns: int) -> List[List[bool]]: ...
+
+class RibbonGridArray(object):
+    rows: int
+    _cells: np.ndarray
+
+    def __init__(self, rows: int, capacity: int): ...
+    def capacity(self) -> int: ...
+    def reserve(self, columns: int): ...
+    def occupied(self, col: int) -> int: ...
+    def setAvailable(self, row: int, col: int, rowSpan: int, colSpan: int, available: bool): ...
+    def cells(self, columns: int) -> np.ndarray: ...
+
 class RibbonGridLayoutManager(object):
     rows: int
-    cells: np.ndarray
+    columns: int
+    _initialCapacity: int
+    _storage: Union[RibbonGridBitset, RibbonGridArray]
+    _fullMask: int
+    _freeRuns: List[int]
+    _fitColumns: List[Set[int]]
+    _firstRows: List[List[int]]
+    _firstRowColumns: List[List[List[int]]]
+    _regions: Dict[Tuple[int, int], Tuple[int, int]]
 
-    def __init__(self, rows: int): ...
+    def __init__(self, rows: int, backend: RibbonGridBackend = RibbonGridBackend.Bitset): ...
+    @property
+    def cells(self) -> Union[List[List[bool]], np.ndarray]: ...
+    def capacity(self) -> int: ...
+    @staticmethod
+    def _firstRun(available: int, rowSpan: int) -> int: ...
+    @staticmethod
+    def _longestRun(available: int) -> int: ...
+    def _appendColumns(self, count: int): ...
+    def _updateFreeRun(self, col: int): ...
+    def _pushFirstRow(self, rowSpan: int, row: int, col: int): ...
+    def _occupy(self, row: int, col: int, rowSpan: int, colSpan: int): ...
+    def _findColumnWise(self, rowSpan: int, colSpan: int) -> Optional[Tuple[int, int]]: ...
+    def reserve(self, columns: int): ...
     def request_cells(
         self, rowSpan: int = 1, colSpan: int = 1, mode: RibbonSpaceFindMode = ColumnWise
     ): ...
+    def request_many(
+        self, requests: Iterable[Tuple[int, int, RibbonSpaceFindMode]]
+    ) -> List[Tuple[int, int]]: ...
+    @staticmethod
+    def plan_cache_info() -> functools._CacheInfo: ...
+    @staticmethod
+    def clear_plan_cache(): ...
+    def release_cells(self, row: int, col: int): ...
+
+def _planCells(
+    rows: int, requests: Tuple[Tuple[int, int, RibbonSpaceFindMode], ...]
+) -> Tuple[Tuple[Tuple[Tuple[int, int], Tuple[int, int]], ...], int]: ...
+
+_sizedMethodPattern: Pattern[str]
+
+def _acceptsRowSpan(method: Callable) -> bool: ...
+def _specSpans(
+    method: Callable, kwargs: Mapping[str, Any]
+) -> Tuple[Union[int, RibbonButtonStyle], int, RibbonSpaceFindMode]: ...
+def _installSizedMethods(cls: type): ...
 
 class RibbonPanelItemWidget(QFrame):
     def __init__(self, parent=None): ...
     def addWidget(self, widget): ...
 
+def _resetItem(item: RibbonPanelItemWidget) -> bool: ...
+
+class RibbonPanelPlacement(object):
+    item: Optional[QWidget]
+    row: int
+    col: int
+    rowSpan: int
+    colSpan: int
+    mode: RibbonSpaceFindMode
+    alignment: Qt.AlignmentFlag
+    fixedHeight: Union[bool, float]
+    commandName: str
+
+    def __init__(
+        self,
+        rowSpan: int,
+        colSpan: int,
+        mode: RibbonSpaceFindMode,
+        alignment: Qt.AlignmentFlag,
+        fixedHeight: Union[bool, float],
+    ): ...
+
 class RibbonPanelOptionButton(QToolButton): ...
 
+class RibbonPanelCollapsedButton(RibbonToolButton): ...
+
+class RibbonPanelPopup(QFrame):
+    _gridLayout: QGridLayout
+
+    def __init__(self, parent=None): ...
+    def gridLayout(self) -> QGridLayout: ...
+
+def _freezeSpec(data: Mapping[str, Mapping]) -> Tuple: ...
+def _freezeValue(value: Any) -> Any: ...
+
+class RibbonWidgetsSpec(object):
+    _entries: Tuple[Tuple[str, str, Tuple, Mapping[str, Any]], ...]
+    _methods: Dict[type, Tuple[Optional[Callable], ...]]
+    _spans: Dict[type, Tuple[Optional[Tuple], ...]]
+    _cache: collections.OrderedDict[Any, RibbonWidgetsSpec]
+    _cacheSize: int
+
+    def __init__(self, data: Mapping[str, Mapping]): ...
+    @classmethod
+    def compile(cls, data: Mapping[str, Mapping]) -> RibbonWidgetsSpec: ...
+    def __len__(self) -> int: ...
+    def keys(self) -> List[str]: ...
+    def entries(self) -> Tuple[Tuple[str, str, Tuple, Mapping[str, Any]], ...]: ...
+    def methods(self, cls: type) -> Tuple[Optional[Callable], ...]: ...
+    def spans(self, cls: type) -> Tuple[Optional[Tuple], ...]: ...
+
 class RibbonPanel(QFrame):
     _maxRows: int = 6
     _largeRows: int = 6
@@ -64,8 +192,25 @@ class RibbonPanel(QFrame):
     _smallRows: int = 2
     _gridLayoutManager: RibbonGridLayoutManager
     _showPanelOptionButton: bool
+    _flatLayout: bool = False
 
     _widgets: List[QWidget] = []
+    _placements: Dict[QWidget, RibbonPanelPlacement]
+    _pendingWidgets: Optional[List[Tuple[QWidget, Dict[str, Any]]]] = None
+    _lazyWidgets: List[Tuple[Dict[str, QWidget], str, Callable, tuple, dict, Tuple[int, int, int, int]]]
+    _reservedCells: Optional[Dict[QWidget, Tuple[int, int, int, int]]] = None
+    _placementKeys: Tuple[str, ...]
+    _rowMetrics: Optional[Tuple[int, int, int]] = None
+    _stage: RibbonPanelStage = RibbonPanelStage.Large
+    _stageWidths: Dict[RibbonPanelStage, int]
+    _itemWidths: Dict[QWidget, Dict[RibbonButtonStyle, int]]
+    _buttonStyles: Dict[RibbonToolButton, Tuple[RibbonButtonStyle, Qt.ToolButtonStyle]]
+    _collapsedButton: Optional[RibbonPanelCollapsedButton] = None
+    _popup: Optional[RibbonPanelPopup] = None
+    _commandRegistry: Optional[RibbonCommandRegistry] = None
+    _categoryTitle: str = ""
+    _widgetPool: Optional[RibbonWidgetPool] = None
+    _batchUpdateDepth: int = 0
 
     _titleHeight: int = 20
 
@@ -97,11 +242,37 @@ class RibbonPanel(QFrame):
     def panelOptionButton(self) -> RibbonPanelOptionButton: ...
     def setPanelOptionToolTip(self, text: str): ...
     def rowHeight(self) -> int: ...
+    def _rowMetricsAt(self, height: int) -> Tuple[int, int, int]: ...
+    def _updateRowMetrics(self) -> Tuple[int, int, int]: ...
+    def resizeEvent(self, a0: QResizeEvent): ...
+    def changeEvent(self, a0: QEvent): ...
+    def flatLayout(self) -> bool: ...
+    def setFlatLayout(self, flat: bool): ...
     def setTitle(self, title: str): ...
     def title(self) -> str: ...
     def setTitleHeight(self, height: int): ...
     def titleHeight(self) -> int: ...
-    def addWidgetsBy(self, data: Dict[str, Dict]) -> Dict[str, QWidget]: ...
+    def batchUpdate(self) -> ContextManager[None]: ...
+    def addWidgetsBy(
+        self, data: Union[Dict[str, Dict], RibbonWidgetsSpec], lazy: bool = False
+    ) -> Dict[str, QWidget]: ...
+    @staticmethod
+    def _nameWidget(widget: QWidget, name: str) -> QWidget: ...
+    def materialize(self): ...
+    def showEvent(self, a0: QShowEvent): ...
+    def _deferPlacement(self) -> ContextManager[None]: ...
+    def _flushPendingWidgets(self): ...
+    def _constrainHeight(
+        self,
+        widget: QWidget,
+        placement: RibbonPanelPlacement,
+        rowHeight: int,
+        buttonHeight: int,
+        rowSpan: Optional[int] = None,
+    ): ...
+    @staticmethod
+    def _fitIconSize(button: RibbonToolButton, buttonHeight: int): ...
+    def _placeWidget(self, widget: QWidget, placement: RibbonPanelPlacement, rowHeight: int, buttonHeight: int): ...
     def addWidget(
         self,
         widget: QWidget,
@@ -112,6 +283,8 @@ class RibbonPanel(QFrame):
         alignment: Qt.AlignmentFlag = Qt.AlignmentFlag.AlignCenter,
         fixedHeight: Union[bool, float] = False,
     ) -> QWidget | Any: ...
+    def addWidgets(self, widgets: Iterable[Union[QWidget, Tuple[QWidget, Dict[str, Any]]]]) -> List[QWidget]: ...
+    def _takeReservedCells(self, items: List[Tuple[QWidget, RibbonPanelPlacement]]) -> List[Tuple[int, int]]: ...
     def addSmallWidget(
         self,
         widget: QWidget,
@@ -140,6 +313,26 @@ class RibbonPanel(QFrame):
         fixedHeight: Union[bool, float] = False,
     ) -> QWidget | Any: ...
     def removeWidget(self, widget: QWidget): ...
+    def clear(self): ...
+    def widgetPool(self) -> Optional[RibbonWidgetPool]: ...
+    def setWidgetPool(self, pool: Optional[RibbonWidgetPool]): ...
+    def compact(self): ...
+    def _setCommandRegistry(self, registry: Optional[RibbonCommandRegistry], category: str): ...
+    def stage(self) -> RibbonPanelStage: ...
+    def setStage(self, stage: RibbonPanelStage): ...
+    def stageWidth(self, stage: RibbonPanelStage) -> int: ...
+    def _itemWidth(self, widget: QWidget, placement: RibbonPanelPlacement, style: Optional[RibbonButtonStyle]) -> int: ...
+    def _gridWidth(self, cells: Iterable[Tuple[int, int, int]]) -> int: ...
+    def _invalidateStages(self): ...
+    def _stageCells(
+        self, stage: RibbonPanelStage
+    ) -> Tuple[List[Tuple[QWidget, RibbonPanelPlacement, Optional[RibbonButtonStyle], int]], List[Tuple[int, int]]]: ...
+    def _applyStage(self, stage: RibbonPanelStage): ...
+    @staticmethod
+    def _setButtonStyle(button: RibbonToolButton, style: RibbonButtonStyle, toolButtonStyle: Qt.ToolButtonStyle): ...
+    def _panelCollapsedButton(self) -> RibbonPanelCollapsedButton: ...
+    def _panelPopup(self) -> RibbonPanelPopup: ...
+    def _showPopup(self): ...
     def widget(self, index: int) -> QWidget: ...
     def widgets(self) -> List[QWidget]: ...
     def addButton(
@@ -339,6 +532,7 @@ class RibbonPanel(QFrame):
         fixedHeight: Union[bool, float] = False,
         **kwargs,
     ) -> QWidget: ...
+    def __init_subclass__(cls, **kwargs): ...
     def __getattr__(self, method: str) -> Callable: ...
     def addComboBox(
         self,
@@ -0,0 +1,205 @@
+import collections
+import typing
+import warnings
+
+from PySide.QtGui import QIcon, QKeySequence
+from PySide.QtWidgets import QToolButton, QWidget
+from PySide.QtCore import Qt
+
+from .constants import RibbonButtonStyle
+from .toolbutton import RibbonToolButton
+
+#: The maximum size of a widget, used to reset the size constraints
+QWIDGETSIZE_MAX = 16777215
+
+
+class RibbonWidgetPool(object):
+    """Pool of the widgets released from panels, kept to be reused instead of constructing new ones.
+
+    The widgets are pooled by class and button style. Only the widgets that can be reset to the state of a newly
+    constructed widget are accepted, that is the ribbon tool buttons, the items wrapping the panel widgets and the
+    classes registered with registerResetter(). When the pool is full, the widgets of the class and button style
+    released the longest time ago are deleted.
+    """
+
+    #: The widgets by (class, button style), the key released to last is at the end
+    _widgets: typing.Dict[typing.Tuple[type, typing.Optional[RibbonButtonStyle]], typing.List[QWidget]]
+    #: The number of pooled widgets
+    _size: int = 0
+    #: The maximum number of pooled widgets
+    _maximumSize: int
+    #: The maximum number of pooled widgets of a class and button style
+    _maximumSizePerKey: int
+
+    #: The functions resetting the widgets by class, only the widgets of these classes are pooled
+    _resetters: typing.Dict[type, typing.Callable[[QWidget], bool]] = {}
+
+    def __init__(self, maximumSize: int = 256, maximumSizePerKey: int = 64):
+        """Create a new widget pool.
+
+        :param maximumSize: The maximum number of pooled widgets.
+        :param maximumSizePerKey: The maximum number of pooled widgets of a class and button style.
+        """
+        self._widgets = collections.OrderedDict()
+        self._maximumSize = maximumSize
+        self._maximumSizePerKey = maximumSizePerKey
+
+    def size(self) -> int:
+        """Return the number of pooled widgets.
+
+        :return: The number of pooled widgets.
+        """
+        return self._size
+
+    def maximumSize(self) -> int:
+        """Return the maximum number of pooled widgets.
+
+        :return: The maximum number of pooled widgets.
+        """
+        return self._maximumSize
+
+    def setMaximumSize(self, size: int):
+        """Set the maximum number of pooled widgets, the extra widgets are deleted. 0 disables the pool.
+
+        :param size: The maximum number of pooled widgets.
+        """
+        self._maximumSize = size
+        self._evict()
+
+    def maximumSizePerKey(self) -> int:
+        """Return the maximum number of pooled widgets of a class and button style.
+
+        :return: The maximum number of pooled widgets of a class and button style.
+        """
+        return self._maximumSizePerKey
+
+    def setMaximumSizePerKey(self, size: int):
+        """Set the maximum number of pooled widgets of a class and button style, the extra widgets are deleted.
+
+        :param size: The maximum number of pooled widgets of a class and button style.
+        """
+        self._maximumSizePerKey = size
+        for key in list(self._widgets):
+            self._trim(key, size)
+
+    @staticmethod
+    def _key(widget: QWidget) -> typing.Tuple[type, typing.Optional[RibbonButtonStyle]]:
+        """Return the key of a widget in the pool."""
+        return type(widget), widget.buttonStyle() if isinstance(widget, RibbonToolButton) else None
+
+    def acquire(
+        self, cls: type, style: RibbonButtonStyle = None, parent: QWidget = None
+    ) -> typing.Optional[QWidget]:
+        """Take a pooled widget.
+
+        :param cls: The class of the widget.
+        :param style: The button style of the widget, for tool buttons.
+        :param parent: The new parent of the widget.
+        :return: The widget, None if there is no pooled widget of the class and button style.
+        """
+        widgets = self._widgets.get((cls, style))
+        if not widgets:
+            return None
+        widget = widgets.pop()
+        self._size -= 1
+        if not widgets:
+            del self._widgets[(cls, style)]
+        if parent is not None:
+            widget.setParent(parent)
+            widget.setVisible(True)
+        return widget
+
+    def release(self, widget: QWidget) -> bool:
+        """Reset a widget and put it into the pool.
+
+        :param widget: The widget, it must have been detached from its panel.
+        :return: Whether the widget is pooled, the widgets that are not pooled are left untouched.
+        """
+        if self._maximumSize <= 0 or self._maximumSizePerKey <= 0 or not self._reset(widget):
+            return False
+        key = self._key(widget)
+        self._widgets.setdefault(key, []).append(widget)
+        self._widgets.move_to_end(key)
+        self._size += 1
+        self._trim(key, self._maximumSizePerKey)
+        self._evict()
+        return True
+
+    def clear(self):
+        """Delete all the pooled widgets."""
+        for widgets in self._widgets.values():
+            for widget in widgets:
+                widget.deleteLater()
+        self._widgets.clear()
+        self._size = 0
+
+    def _trim(self, key: typing.Tuple[type, typing.Optional[RibbonButtonStyle]], size: int):
+        """Delete the widgets released first to a key until there are at most size of them."""
+        widgets = self._widgets[key]
+        while len(widgets) > size:
+            widgets.pop(0).deleteLater()
+            self._size -= 1
+        if not widgets:
+            del self._widgets[key]
+
+    def _evict(self):
+        """Delete the widgets of the keys released the longest time ago until the pool is not over its size."""
+        while self._size > max(self._maximumSize, 0):
+            key = next(iter(self._widgets))
+            self._trim(key, len(self._widgets[key]) - 1)
+
+    @classmethod
+    def registerResetter(cls, widgetClass: type, resetter: typing.Callable[[QWidget], bool]):
+        """Accept the widgets of a class in the pools.
+
+        :param widgetClass: The class of the widgets, its subclasses are not accepted.
+        :param resetter: The function resetting a widget of the class to the state of a newly constructed one, it
+                         returns whether the widget can be pooled.
+        """
+        cls._resetters[widgetClass] = resetter
+
+    def _reset(self, widget: QWidget) -> bool:
+        """Reset a widget to the state of a newly constructed one.
+
+        :param widget: The widget.
+        :return: Whether the widget can be pooled.
+        """
+        resetter = self._resetters.get(type(widget))
+        if widget.parent() is not None or resetter is None or not resetter(widget):
+            return False
+        widget.setObjectName("")
+        widget.setEnabled(True)
+        widget.setMinimumHeight(0)
+        widget.setMaximumHeight(QWIDGETSIZE_MAX)
+        return True
+
+
+def _resetButton(button: RibbonToolButton) -> bool:
+    """Reset a tool button, its button style and the style sheet of the style are kept."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        for name in ("clicked", "pressed", "released", "toggled", "triggered"):
+            try:
+                getattr(button, name).disconnect()
+            except (TypeError, RuntimeError):  # no connection
+                pass
+    for action in button.actions():
+        button.removeAction(action)
+    button.setMenu(None)  # type: ignore
+    button.setPopupMode(QToolButton.ToolButtonPopupMode.DelayedPopup)
+    button.setChecked(False)
+    button.setCheckable(False)
+    button.setText("")
+    button.setIcon(QIcon())
+    button.setShortcut(QKeySequence())
+    button.setToolTip("")
+    button.setStatusTip("")
+    button.setToolButtonStyle(
+        Qt.ToolButtonStyle.ToolButtonTextUnderIcon
+        if button.buttonStyle() == RibbonButtonStyle.Large
+        else Qt.ToolButtonStyle.ToolButtonTextBesideIcon
+    )
+    return True
+
+
+RibbonWidgetPool.registerResetter(RibbonToolButton, _resetButton)
@@ -1,3 +1,4 @@
+import contextlib
 import typing
 
 from PySide.QtGui import QIcon, QColor
@@ -17,6 +18,7 @@ from PySide.QtCore import (
     Signal,
     QEvent,
     QObject,
+    QTimer,
 )
 
 from .category import (
@@ -25,11 +27,14 @@ from .category import (
     RibbonContextCategory,
     RibbonNormalCategory,
 )
-from .constants import RibbonCategoryStyle, RibbonStyle, contextColors
+from .commands import RibbonCommandRegistry
+from .constants import RibbonCategoryStyle, RibbonStyle, RibbonStyleBackend, contextColors
+from .pool import RibbonWidgetPool
+from .style import RibbonProxyStyle
 from .menu import RibbonMenu
 from .tabbar import RibbonTabBar
 from .titlewidget import RibbonApplicationButton, RibbonTitleWidget
-from .utils import DataFile
+from .utils import DataFile, readDataFile, readFile, suspendUpdates
 
 
 class RibbonStackedWidget(QStackedWidget):
@@ -57,6 +62,17 @@ class RibbonBar(QWidget):
 
     #: The categories of the ribbon.
     _categories: typing.Dict[str, RibbonCategory] = {}
+    #: The registry of the named widgets of the ribbon.
+    _commandRegistry: RibbonCommandRegistry
+    #: The pool of the widgets released from the panels of the ribbon.
+    _widgetPool: RibbonWidgetPool
+    #: The style of the ribbon and its rendering backend.
+    _ribbonStyle: typing.Union[RibbonStyle, str] = RibbonStyle.Default
+    _styleBackend = RibbonStyleBackend.StyleSheet
+    #: The proxy style drawing the default style, created when the proxy style backend is first used.
+    _proxyStyle: typing.Optional[RibbonProxyStyle] = None
+    #: The timer building the categories with builders when the application is idle, created when it is started.
+    _buildTimer: typing.Optional[QTimer] = None
     _contextCategoryCount = 0
 
     #: Maximum rows
@@ -100,6 +116,8 @@ class RibbonBar(QWidget):
             parent = args[1] if len(args) > 1 else kwargs.get("parent", None)
         super().__init__(parent)
         self._categories = {}
+        self._commandRegistry = RibbonCommandRegistry()
+        self._widgetPool = RibbonWidgetPool()
         self._maxRows = maxRows
         self.setFixedHeight(self._ribbonHeight)
 
@@ -221,15 +239,58 @@ class RibbonBar(QWidget):
             "RibbonBar.setNativeMenuBar() is not implemented in the ribbon bar."
         )
 
-    def setRibbonStyle(self, style: RibbonStyle):
+    def setRibbonStyle(self, style: typing.Union[RibbonStyle, str]):
         """Set the style of the ribbon.
 
-        :param style: The style to set.
-        """
-        self.setStyleSheet(
-            open(DataFile("styles/base.qss"), "r").read()
-            + open(DataFile(f"styles/{style.name.lower()}.qss"), "r").read()
+        The style sheets are read once per process and cached, a custom style sheet is read again when the file is
+        modified. With the proxy style backend, the default style is drawn without style sheets, see
+        setStyleBackend().
+
+        :param style: The style to set, or the path of a custom style sheet applied on top of the base style.
+        """
+        self._ribbonStyle = style
+        if self._styleBackend == RibbonStyleBackend.ProxyStyle and style == RibbonStyle.Default:
+            if self.styleSheet():
+                self.setStyleSheet("")
+            if self._proxyStyle is None:
+                self._proxyStyle = RibbonProxyStyle()
+                self._proxyStyle.setParent(self)
+            self._proxyStyle.apply(self)
+            return
+        if self._proxyStyle is not None:
+            RibbonProxyStyle.unapply(self)
+        styleSheet = readDataFile("styles/base.qss") + (
+            readDataFile(f"styles/{style.name.lower()}.qss") if isinstance(style, RibbonStyle) else readFile(style)
         )
+        if styleSheet != self.styleSheet():
+            self.setStyleSheet(styleSheet)
+
+    def ribbonStyle(self) -> typing.Union[RibbonStyle, str]:
+        """Return the style of the ribbon.
+
+        :return: The style, or the path of the custom style sheet.
+        """
+        return self._ribbonStyle
+
+    def styleBackend(self) -> RibbonStyleBackend:
+        """Return the rendering backend of the ribbon style.
+
+        :return: The rendering backend.
+        """
+        return self._styleBackend
+
+    def setStyleBackend(self, backend: RibbonStyleBackend):
+        """Set the rendering backend of the ribbon style, the current style is applied again.
+
+        With StyleSheet, the styles are Qt style sheets set on the ribbon, every widget of the ribbon is polished
+        again when the style changes or a widget is added. With ProxyStyle, the default style is drawn by a proxy
+        of the application style set on the ribbon widgets it customizes, which is much cheaper to build and to
+        switch. The debug style and the custom style sheets are always style sheets.
+
+        :param backend: The rendering backend.
+        """
+        self._styleBackend = backend
+        self.setRibbonStyle(self._ribbonStyle)
 
     def applicationOptionButton(self) -> RibbonApplicationButton:
         """Return the application button."""
@@ -406,12 +467,62 @@ class RibbonBar(QWidget):
         """
         return self._categories
 
+    def command(self, path: str) -> QWidget:
+        """Return a named widget of the ribbon.
+
+        The widgets are named by their object names, the keys of the specs of addCategoriesBy(),
+        RibbonCategory.addPanelsBy() and RibbonPanel.addWidgetsBy() are used as object names. The lookup does not
+        walk the categories and panels.
+
+        :param path: The path of the widget, "category/panel/name", "panel/name" or "name". When the path is not
+                     complete and several widgets match, the one added first is returned.
+        :return: The widget.
+        :raises KeyError: If no widget matches the path.
+        """
+        return self._commandRegistry.command(path)
+
+    def commands(self, name: str) -> typing.List[QWidget]:
+        """Return all the widgets of the ribbon with a name.
+
+        :param name: The name of the widgets.
+        :return: The widgets, in the order they were added.
+        """
+        return self._commandRegistry.commands(name)
+
+    def widgetPool(self) -> RibbonWidgetPool:
+        """Return the pool of the widgets released from the panels of the ribbon.
+
+        The buttons removed by RibbonPanel.clear() are reset and kept in the pool, and reused by the panels of the
+        ribbon instead of constructing new ones. Use RibbonWidgetPool.setMaximumSize() to limit the pool.
+
+        :return: The widget pool.
+        """
+        return self._widgetPool
+
+    @contextlib.contextmanager
+    def batchUpdate(self):
+        """Suspend the repaint and the layout of the ribbon in the context, the ribbon is laid out and repainted
+        once on exit. The contexts can be nested, and combined with the contexts of the categories and the panels.
+
+        .. code-block:: python
+
+            with ribbon.batchUpdate():
+                category = ribbon.addCategory("Category 1")
+                with category.batchUpdate():
+                    panel = category.addPanel("Panel 1")
+        """
+        with suspendUpdates(
+            self, self._mainLayout, self._titleWidget.layout(), self._stackedWidget.layout()
+        ):
+            yield
+
     def addCategoriesBy(
         self,
         data: typing.Dict[
             str,  # title of the category
             typing.Dict,  # data of the category
         ],
+        lazy: bool = False,
     ) -> typing.Dict[str, RibbonCategory]:
         """Add categories from a dict.
 
@@ -440,14 +551,22 @@ class RibbonBar(QWidget):
                         },
                     }
                 }
+        :param lazy: Whether to add the panels of a category the first time it is shown, see addCategory().
         :return: A dict of categories of the ribbon.
         """
         categories = {}
-        for title, category_data in data.items():
-            style = category_data.get("style", RibbonCategoryStyle.Normal)
-            color = category_data.get("color", None)
-            categories[title] = self.addCategory(title, style, color)
-            categories[title].addPanelsBy(category_data.get("panels", {}))
+        with self.batchUpdate():
+            for title, category_data in data.items():
+                style = category_data.get("style", RibbonCategoryStyle.Normal)
+                color = category_data.get("color", None)
+                panels = category_data.get("panels", {})
+                if lazy:
+                    categories[title] = self.addCategory(
+                        title, style, color, builder=lambda category, panels=panels: category.addPanelsBy(panels)
+                    )
+                else:
+                    categories[title] = self.addCategory(title, style, color)
+                    categories[title].addPanelsBy(panels)
         return categories
 
     def addCategory(
@@ -455,6 +574,7 @@ class RibbonBar(QWidget):
         title: str,
         style=RibbonCategoryStyle.Normal,
         color: QColor = None,
+        builder: typing.Callable[[RibbonCategory], typing.Any] = None,
     ) -> typing.Union[RibbonNormalCategory, RibbonContextCategory]:
         """Add a new category to the ribbon.
 
@@ -462,6 +582,9 @@ class RibbonBar(QWidget):
         :param style: The button style of the category.
         :param color: The color of the context category, only used if style is Context, if None, the default color
                       will be used.
+        :param builder: A callable adding the panels of the category. The tab is added at once, but the builder is
+                        only called with the category the first time it is shown or its panels are accessed, or
+                        when the application is idle after buildCategoriesWhenIdle() is called.
         :return: The newly created category.
         """
         if title in self._categories:
@@ -476,6 +599,10 @@ class RibbonBar(QWidget):
             else RibbonNormalCategory(title, self)  # noqa
         )
         category.setMaximumRows(self._maxRows)
+        RibbonProxyStyle.inherit(category)
+        category.setBuilder(builder)
+        category._setCommandRegistry(self._commandRegistry)
+        category._setWidgetPool(self._widgetPool)
         category.setFixedHeight(
             self._ribbonHeight
             - self._mainLayout.spacing() * 2
@@ -483,11 +610,15 @@ class RibbonBar(QWidget):
             - self._mainLayout.contentsMargins().bottom()
             - self._titleWidget.height()
         )  # 4: extra space for drawing lines when debugging
+        tabBar = self._titleWidget.tabBar()
+        contextTabsIndex = self._contextTabsIndex()
         self._categories[title] = category
         self._stackedWidget.addWidget(category)
         if style == RibbonCategoryStyle.Normal:
-            self._titleWidget.tabBar().addTab(title, color)
+            tabBar.insertTab(contextTabsIndex, title, color, category)
         elif style == RibbonCategoryStyle.Context:
+            if tabBar._tabVisibilitySupported:  # the tab is kept in the bar and shown with the category
+                tabBar.setTabVisible(tabBar.addTab(title, color, category), False)
             category.hide()
         if len(self._categories) == 1:
             self._titleWidget.tabBar().setCurrentIndex(1)
@@ -547,31 +678,74 @@ class RibbonBar(QWidget):
         self._currentTabIndex = index
         title = self._titleWidget.tabBar().tabText(index)  # 0 is the file tab
         if title in self._categories:
+            self._categories[title].build()
             self._stackedWidget.setCurrentWidget(self._categories[title])
 
+    def buildCategoriesWhenIdle(self, interval: int = 0):
+        """Build the categories added with a builder that are not built yet, one at a time when the application is
+        idle, so that they are ready when they are shown first.
+
+        :param interval: The time in milliseconds between the builds of two categories.
+        """
+        if self._buildTimer is None:
+            self._buildTimer = QTimer(self)
+            self._buildTimer.setSingleShot(True)
+            self._buildTimer.timeout.connect(self._buildNextCategory)  # type: ignore
+        self._buildTimer.setInterval(interval)
+        self._buildTimer.start()
+
+    def _buildNextCategory(self):
+        """Build the first category that is not built yet, and schedule the build of the next one."""
+        categories = [
+            category
+            for category in self._categories.values()
+            if not category.isBuilt() and self._stackedWidget.indexOf(category) >= 0
+        ]
+        if categories:
+            categories[0].build()
+        if len(categories) > 1:
+            self._buildTimer.start()
+
+    def _contextTabsIndex(self) -> int:
+        """Return the index of the first tab of a context category, the tabs of the normal categories are inserted
+        before the tabs of the context categories.
+        """
+        tabBar = self._titleWidget.tabBar()
+        indices = [
+            tabBar.indexOfData(category)
+            for category in self._categories.values()
+            if isinstance(category, RibbonContextCategory)
+        ]
+        return min([index for index in indices if index >= 0], default=tabBar.count())
+
     def showContextCategory(
         self, category: typing.Union[RibbonContextCategory, RibbonContextCategories]
     ):
         """Show the given category or categories, if it is not a context category, nothing happens.
 
+        The tabs of the context categories stay in the tab bar and are only made visible, so that the indices of
+        the other tabs do not change. With Qt versions older than 5.15, the tabs are added instead.
+
         :param category: The category to show.
         """
         if isinstance(category, RibbonContextCategory):
-            self._titleWidget.tabBar().addTab(category.title(), category.color())
-            self._titleWidget.tabBar().setCurrentIndex(
-                self._titleWidget.tabBar().count() - 1
-            )
-            self._stackedWidget.setCurrentWidget(category)
+            categories = [category]
         elif isinstance(category, RibbonContextCategories):
-            categories = category
-            titles = list(categories.keys())
-            self._titleWidget.tabBar().addAssociatedTabs(
-                categories.name(), titles, categories.color()
-            )
-            self._titleWidget.tabBar().setCurrentIndex(
-                self._titleWidget.tabBar().count() - len(titles)
-            )
-            self._stackedWidget.setCurrentWidget(categories[titles[0]])
+            categories = list(category.values())
+        else:
+            return
+        tabBar = self._titleWidget.tabBar()
+        if tabBar._tabVisibilitySupported:
+            for c in categories:
+                tabBar.setTabVisible(tabBar.indexOfData(c), True)
+        else:
+            hidden = [c for c in categories if tabBar.indexOfData(c) < 0]
+            if isinstance(category, RibbonContextCategories):
+                tabBar.addAssociatedTabs(category.name(), [c.title() for c in hidden], category.color(), hidden)
+            elif hidden:
+                tabBar.addTab(category.title(), category.color(), category)
+        tabBar.setCurrentIndex(tabBar.indexOfData(categories[0]))
+        self._stackedWidget.setCurrentWidget(categories[0])
 
     def hideContextCategory(
         self, category: typing.Union[RibbonContextCategory, RibbonContextCategories]
@@ -581,11 +755,20 @@ class RibbonBar(QWidget):
         :param category: The category to hide.
         """
         if isinstance(category, RibbonContextCategory):
-            self.tabBar().removeTab(self.tabBar().indexOf(category.title()))
+            categories = [category]
         elif isinstance(category, RibbonContextCategories):
-            categories = category
-            for c in categories:
-                self.tabBar().removeTab(self.tabBar().indexOf(c.title()))
+            categories = list(category.values())
+        else:
+            return
+        tabBar = self._titleWidget.tabBar()
+        for c in categories:
+            index = tabBar.indexOfData(c)
+            if index < 0:
+                continue
+            if tabBar._tabVisibilitySupported:
+                tabBar.setTabVisible(index, False)
+            else:
+                tabBar.removeTab(index)
 
     def categoryVisible(self, category: RibbonCategory) -> bool:
         """Return whether the category is shown.
@@ -594,15 +777,18 @@ class RibbonBar(QWidget):
 
         :return: Whether the category is shown.
         """
-        return category.title() in self._titleWidget.tabBar().tabTitles()
+        tabBar = self._titleWidget.tabBar()
+        index = tabBar.indexOfData(category)
+        return index >= 0 and (not tabBar._tabVisibilitySupported or tabBar.isTabVisible(index))
 
     def removeCategory(self, category: RibbonCategory):
         """Remove a category from the ribbon.
 
         :param category: The category to remove.
         """
-        self.tabBar().removeTab(self._titleWidget.tabBar().indexOf(category.title()))
+        self.tabBar().removeTab(self._titleWidget.tabBar().indexOfData(category))
         self._stackedWidget.removeWidget(category)
+        category._setCommandRegistry(None)
 
     def removeCategories(self, categories: RibbonContextCategories):
         """Remove a list of categories from the ribbon.
@@ -618,10 +804,8 @@ class RibbonBar(QWidget):
         :param category: The category to set.
         """
         self._stackedWidget.setCurrentWidget(category)
-        if category.title() in self._titleWidget.tabBar().tabTitles():
-            self._titleWidget.tabBar().setCurrentIndex(
-                self._titleWidget.tabBar().indexOf(category.title())
-            )
+        if self.categoryVisible(category):
+            self._titleWidget.tabBar().setCurrentIndex(self._titleWidget.tabBar().indexOfData(category))
         else:
             raise ValueError(
                 f"Category {category.title()} is not in the ribbon, "
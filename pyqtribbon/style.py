@@ -0,0 +1,228 @@
+import typing
+
+from PySide.QtGui import QColor, QPainter, QPalette, QPen
+from PySide.QtWidgets import (
+    QFrame,
+    QProxyStyle,
+    QStyle,
+    QStyleOption,
+    QStyleOptionMenuItem,
+    QStyleOptionTab,
+    QTabBar,
+    QWidget,
+)
+from PySide.QtCore import Qt, QRectF, QSize
+
+
+def _inherits(widget: typing.Optional[QWidget], *classNames: str) -> bool:
+    """Return whether a widget is an instance of one of the classes, the classes are given by their names so that
+    the style does not import the widget modules.
+    """
+    return widget is not None and any(widget.inherits(className) for className in classNames)
+
+
+class RibbonProxyStyle(QProxyStyle):
+    """Style drawing the ribbon like the default style sheet, through a proxy of the application style and the
+    palettes of the widgets, without style sheets.
+
+    The style is set on the widgets of the ribbon whose look is customized by the default style sheet, the other
+    widgets keep the application style. Unlike a style sheet set on the ribbon, the style does not cascade to the
+    descendants, so the widgets are not polished again when a widget is added or reparented.
+    """
+
+    #: Classes of the widgets the style is set on
+    _styledClasses = (
+        "RibbonBar",
+        "RibbonTitleWidget",
+        "RibbonTabBar",
+        "RibbonApplicationButton",
+        "RibbonStackedWidget",
+        "RibbonCategory",
+        "RibbonCategoryScrollArea",
+        "RibbonCategoryScrollAreaContents",
+        "RibbonGallery",
+        "RibbonGalleryButton",
+        "RibbonGalleryListWidget",
+        "QMenu",
+    )
+    #: Classes of the widgets whose background is drawn by the style
+    _backgroundClasses = ("RibbonStackedWidget", "RibbonGallery")
+
+    #: Colors of the default style sheet
+    _borderColor = QColor("gray")
+    _selectedTabColor = QColor("blue")
+    _hoveredTabColor = QColor("gray")
+    _menuSelectionColor = QColor("#e0e0e0")
+    #: Height of the band under the selected and the hovered tabs
+    _tabBandHeight = 3
+    #: Pixel metrics of the tabs, the padding on both sides, the band and no shift of the unselected tabs
+    _tabMetrics = {
+        QStyle.PixelMetric.PM_TabBarTabHSpace: 2 * 10,
+        QStyle.PixelMetric.PM_TabBarTabVSpace: _tabBandHeight,
+        QStyle.PixelMetric.PM_TabBarTabShiftHorizontal: 0,
+        QStyle.PixelMetric.PM_TabBarTabShiftVertical: 0,
+    }
+
+    def apply(self, widget: QWidget):
+        """Set the style on a widget and on its descendants that are customized by the default style sheet.
+
+        :param widget: The root widget, the style is always set on it.
+        """
+        for child in [widget] + widget.findChildren(QWidget):
+            if child is widget or _inherits(child, *self._styledClasses):
+                if child.style() is not self:
+                    child.setStyle(self)
+
+    @classmethod
+    def unapply(cls, widget: QWidget):
+        """Restore the application style of a widget and its descendants that have a ribbon proxy style.
+
+        :param widget: The root widget.
+        """
+        for child in [widget] + widget.findChildren(QWidget):
+            if isinstance(child.style(), RibbonProxyStyle):
+                child.setStyle(None)  # type: ignore
+
+    @staticmethod
+    def inherit(widget: QWidget):
+        """Set the ribbon proxy style of the nearest ancestor that has one on a widget added to the ribbon.
+
+        :param widget: The widget.
+        """
+        parent = widget.parentWidget()
+        while parent is not None:
+            style = parent.style()
+            if isinstance(style, RibbonProxyStyle):
+                style.apply(widget)
+                return
+            parent = parent.parentWidget()
+
+    def polish(self, *args):
+        """Polish a widget, the frames and the automatic backgrounds the default style sheet removes are removed,
+        and the palettes of the menus are set.
+        """
+        super().polish(*args)
+        widget = args[0] if args else None
+        if not isinstance(widget, QWidget):
+            return
+        if _inherits(widget, "RibbonCategoryScrollArea", "RibbonGalleryListWidget"):
+            widget.setFrameShape(QFrame.Shape.NoFrame)
+        if _inherits(widget, "RibbonCategoryScrollArea"):
+            widget.viewport().setAutoFillBackground(False)
+        if _inherits(widget, "RibbonCategoryScrollAreaContents"):
+            widget.setAutoFillBackground(False)
+        if _inherits(widget, *self._backgroundClasses):
+            widget.setAttribute(Qt.WidgetAttribute.WA_StyledBackground, True)
+        if _inherits(widget, "RibbonGallery"):
+            widget.setContentsMargins(1, 1, 1, 1)  # the border drawn by drawPrimitive()
+        if _inherits(widget, "RibbonStackedWidget"):
+            palette = widget.palette()
+            palette.setColor(QPalette.ColorRole.Window, QColor(Qt.GlobalColor.white))
+            widget.setPalette(palette)
+        if _inherits(widget, "QMenu"):
+            palette = widget.palette()
+            palette.setColor(QPalette.ColorRole.Window, QColor(Qt.GlobalColor.white))
+            palette.setColor(QPalette.ColorRole.Base, QColor(Qt.GlobalColor.white))
+            palette.setColor(QPalette.ColorRole.Highlight, self._menuSelectionColor)
+            widget.setPalette(palette)
+
+    def unpolish(self, *args):
+        """Restore what polish() changed on a widget."""
+        widget = args[0] if args else None
+        if isinstance(widget, QWidget):
+            if _inherits(widget, "RibbonCategoryScrollArea", "RibbonGalleryListWidget"):
+                widget.setFrameShape(QFrame.Shape.StyledPanel)
+            if _inherits(widget, "RibbonCategoryScrollArea"):
+                widget.viewport().setAutoFillBackground(True)
+            if _inherits(widget, "RibbonCategoryScrollAreaContents"):
+                widget.setAutoFillBackground(True)
+            if _inherits(widget, *self._backgroundClasses):
+                widget.setAttribute(Qt.WidgetAttribute.WA_StyledBackground, False)
+            if _inherits(widget, "RibbonGallery"):
+                widget.setContentsMargins(0, 0, 0, 0)
+            if _inherits(widget, "RibbonStackedWidget", "QMenu"):
+                widget.setPalette(QPalette())
+        super().unpolish(*args)
+
+    def drawPrimitive(self, element, option: QStyleOption, painter: QPainter, widget: QWidget = None):
+        """Draw the backgrounds and the frames of the ribbon widgets."""
+        if element == QStyle.PrimitiveElement.PE_Widget and _inherits(widget, "RibbonStackedWidget"):
+            self._drawRoundedRect(painter, QRectF(option.rect), 10, option.palette.color(QPalette.ColorRole.Window))
+            return
+        if element == QStyle.PrimitiveElement.PE_Widget and _inherits(widget, "RibbonGallery"):
+            self._drawRoundedRect(painter, QRectF(option.rect).adjusted(0.5, 0.5, -0.5, -0.5), 5, None)
+            return
+        if element == QStyle.PrimitiveElement.PE_FrameMenu and _inherits(widget, "QMenu"):
+            return
+        if element == QStyle.PrimitiveElement.PE_PanelMenu and _inherits(widget, "QMenu"):
+            self._drawRoundedRect(painter, QRectF(option.rect), 5, option.palette.color(QPalette.ColorRole.Window))
+            return
+        if element == QStyle.PrimitiveElement.PE_IndicatorArrowDown and _inherits(widget, "RibbonApplicationButton"):
+            return
+        super().drawPrimitive(element, option, painter, widget)
+
+    def drawComplexControl(self, control, option, painter: QPainter, widget: QWidget = None):
+        """Draw the border of the gallery buttons."""
+        super().drawComplexControl(control, option, painter, widget)
+        if control == QStyle.ComplexControl.CC_ToolButton and _inherits(widget, "RibbonGalleryButton"):
+            self._drawRoundedRect(painter, QRectF(option.rect).adjusted(0.5, 0.5, -0.5, -0.5), 5, None)
+
+    def drawControl(self, element, option: QStyleOption, painter: QPainter, widget: QWidget = None):
+        """Draw the tabs of the ribbon tab bar as a band under the selected and the hovered tabs, the labels of
+        these tabs are centered above the band. Draw the selected menu items on a flat highlight.
+        """
+        if element in (
+            QStyle.ControlElement.CE_TabBarTabShape, QStyle.ControlElement.CE_TabBarTabLabel
+        ) and isinstance(widget, QTabBar):
+            if option.state & QStyle.StateFlag.State_Selected:
+                color = self._selectedTabColor
+            elif option.state & QStyle.StateFlag.State_MouseOver:
+                color = self._hoveredTabColor
+            else:
+                color = None
+            if element == QStyle.ControlElement.CE_TabBarTabShape:
+                if color is not None:
+                    rect = option.rect
+                    band = self._tabBandHeight
+                    painter.fillRect(rect.x(), rect.bottom() - band + 1, rect.width(), band, color)
+                return
+            if color is not None:
+                option = QStyleOptionTab(option)
+                option.rect = option.rect.adjusted(0, 0, 0, -self._tabBandHeight)
+        elif (
+            element == QStyle.ControlElement.CE_MenuItem
+            and option.state & QStyle.StateFlag.State_Selected
+            and _inherits(widget, "QMenu")
+        ):
+            painter.fillRect(option.rect, option.palette.color(QPalette.ColorRole.Highlight))
+            option = QStyleOptionMenuItem(option)
+            option.state &= ~QStyle.StateFlag.State_Selected
+            textColor = option.palette.color(QPalette.ColorRole.HighlightedText)
+            for role in (QPalette.ColorRole.Text, QPalette.ColorRole.ButtonText):
+                option.palette.setColor(role, textColor)
+        super().drawControl(element, option, painter, widget)
+
+    def sizeFromContents(self, contentsType, option: QStyleOption, size: QSize, widget: QWidget = None) -> QSize:
+        """Return the size of the tabs of the ribbon tab bar, the contents with the padding given by pixelMetric()."""
+        if contentsType == QStyle.ContentsType.CT_TabBarTab and isinstance(widget, QTabBar):
+            return QSize(size)
+        return super().sizeFromContents(contentsType, option, size, widget)
+
+    def pixelMetric(self, metric, option: QStyleOption = None, widget: QWidget = None) -> int:
+        """Return the padding of the tabs of the ribbon tab bar, the only tab bar the style is set on."""
+        if metric in self._tabMetrics and isinstance(widget, QTabBar):
+            return self._tabMetrics[metric]
+        return super().pixelMetric(metric, option, widget)
+
+    def _drawRoundedRect(self, painter: QPainter, rect: QRectF, radius: float, fill: typing.Optional[QColor]):
+        """Draw a rounded rectangle, filled without border or bordered without fill."""
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        if fill is not None:
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(fill)
+        else:
+            painter.setPen(QPen(self._borderColor, 1))
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter.drawRoundedRect(rect, radius, radius)
+        painter.restore()
@@ -1,8 +1,8 @@
 import typing
 
-from PySide.QtGui import QColor
-from PySide.QtWidgets import QTabBar
-from PySide.QtCore import Qt
+from PySide.QtGui import QColor, QPainter, QPaintEvent, QPalette
+from PySide.QtWidgets import QStyle, QStyleOptionTab, QStylePainter, QTabBar
+from PySide.QtCore import QObject, Qt
 
 
 class RibbonTabBar(QTabBar):
@@ -10,78 +10,181 @@ class RibbonTabBar(QTabBar):
 
     #: context category top margin
     _contextCategoryTopMargin = 0
-    #: context category dark color height
-    _contextCategoryDarkColorHeight = 5
+    #: context category dark color height, a higher band covers the label of the selected tab
+    _contextCategoryDarkColorHeight = 3
+    #: context category tint alpha, the tabs are tinted with the color under the dark band
+    _contextCategoryTintAlpha = 40
 
     _tabColors: typing.Dict[str, typing.Union[Qt.GlobalColor, QColor]] = {}
     _associated_tabs = {}
+    #: The title of the tab whose text is colored as the current tab
+    _coloredTab: typing.Optional[str] = None
+
+    #: Whether the tabs can be hidden, QTabBar.setTabVisible() is new in Qt 5.15
+    _tabVisibilitySupported = hasattr(QTabBar, "setTabVisible")
+
+    #: The titles and the data of the tabs, in the order of the tabs
+    _titles: typing.List[str]
+    _data: typing.List[typing.Any]
+    #: The indices of the tabs by title, and by the id of their data
+    _titleIndices: typing.Dict[str, int]
+    _dataIndices: typing.Dict[int, int]
 
     def __init__(self, parent=None):
         """Create a new tab bar.
 
         :param parent: The parent widget.
         """
+        self._tabColors = {}
+        self._associated_tabs = {}
+        self._titles = []
+        self._data = []
+        self._titleIndices = {}
+        self._dataIndices = {}
         super().__init__(parent)
 
         self.currentChanged.connect(self.changeColor)
+        self.tabMoved.connect(self._tabMoved)  # type: ignore
         self.setDrawBase(False)
 
     def indexOf(self, tabName: str) -> int:
         """Return the index of the tab with the given name.
 
         :param tabName: The name of the tab.
-        :return: The index of the tab.
+        :return: The index of the tab, -1 if there is no such tab.
         """
-        for i in range(self.count()):
-            if self.tabText(i) == tabName:
-                return i
-        return -1
+        return self._titleIndices.get(tabName, -1)
+
+    def indexOfData(self, data: typing.Any) -> int:
+        """Return the index of the tab with the given data, such as the category of the tab.
+
+        :param data: The data of the tab, compared by identity.
+        :return: The index of the tab, -1 if there is no such tab.
+        """
+        return self._dataIndices.get(id(data), -1)
 
     def tabTitles(self) -> typing.List[str]:
         """Return the titles of all tabs.
 
         :return: The titles of all tabs.
         """
-        return [self.tabText(i) for i in range(self.count())]
+        return list(self._titles)
 
-    def addTab(self, text: str, color: QColor = None, *args, **kwargs) -> int:
+    def addTab(self, text: str, color: QColor = None, data: typing.Any = None, *args, **kwargs) -> int:
         """Add a new tab to the tab bar.
 
         :param text: The text of the tab.
         :param color: The color of the tab.
+        :param data: The data of the tab, such as the category of the tab.
+        :return: The index of the tab.
+        """
+        return self.insertTab(-1, text, color, data)
+
+    def insertTab(self, index: int, text: str, color: QColor = None, data: typing.Any = None, *args, **kwargs) -> int:
+        """Insert a new tab into the tab bar.
+
+        :param index: The index of the tab, the tab is appended if it is out of range.
+        :param text: The text of the tab.
+        :param color: The color of the tab.
+        :param data: The data of the tab, such as the category of the tab.
         :return: The index of the tab.
         """
         self._tabColors[text] = color
-        return super().addTab(text)
+        index = super().insertTab(index, text)
+        if data is not None:
+            self.setTabData(index, data)
+        return index
 
     def addAssociatedTabs(
-        self, name: str, texts: typing.List[str], color: QColor
+        self, name: str, texts: typing.List[str], color: QColor, data: typing.List[typing.Any] = None
     ) -> typing.List[int]:
         """Add associated multiple tabs which have the same color to the tab bar.
 
         :param name: The name of the context category.
         :param texts: The texts of the tabs.
         :param color: The color of the tabs.
+        :param data: The data of the tabs, such as their categories.
         :return: The indices of the tabs.
         """
         self._tabColors[name] = color
         for text in texts:
             self._associated_tabs[text] = [t for t in texts if t != text]
-        return [self.addTab(text, color) for text in texts]
+        return [
+            self.addTab(text, color, data[i] if data is not None else None) for i, text in enumerate(texts)
+        ]
 
     def removeAssociatedTabs(self, titles: typing.List[str]) -> None:
         """Remove tabs with the given titles.
 
         :param titles: The titles of the tabs to remove.
         """
-        tabTitles = self.tabTitles()
         for title in titles:
-            if title in tabTitles:
+            if title in self._titleIndices:
                 self.removeTab(self.indexOf(title))
                 del self._tabColors[title]
                 if title in self._associated_tabs:
                     del self._associated_tabs[title]
 
+    def setTabText(self, index: int, text: str):
+        """Set the text of a tab.
+
+        :param index: The index of the tab.
+        :param text: The text of the tab.
+        """
+        super().setTabText(index, text)
+        if 0 <= index < len(self._titles):
+            if self._titleIndices.get(self._titles[index]) == index:
+                del self._titleIndices[self._titles[index]]
+            if self._coloredTab == self._titles[index]:
+                self._coloredTab = text
+            self._titles[index] = text
+            self._titleIndices[text] = index
+
+    def setTabData(self, index: int, data: typing.Any):
+        """Set the data of a tab.
+
+        :param index: The index of the tab.
+        :param data: The data of the tab, such as the category of the tab.
+        """
+        super().setTabData(index, data)
+        if 0 <= index < len(self._data):
+            if self._dataIndices.get(id(self._data[index])) == index:
+                del self._dataIndices[id(self._data[index])]
+            self._data[index] = data
+            if data is not None:
+                self._dataIndices[id(data)] = index
+
+    def tabInserted(self, index: int):
+        """Index the tab inserted at an index."""
+        self._titles.insert(index, self.tabText(index))
+        self._data.insert(index, None)
+        self._reindex(index, len(self._titles))
+        super().tabInserted(index)
+
+    def tabRemoved(self, index: int):
+        """Unindex the tab removed from an index."""
+        title = self._titles.pop(index)
+        data = self._data.pop(index)
+        if self._titleIndices.get(title) == index:
+            del self._titleIndices[title]
+        if data is not None and self._dataIndices.get(id(data)) == index:
+            del self._dataIndices[id(data)]
+        self._reindex(index, len(self._titles))
+        super().tabRemoved(index)
+
+    def _tabMoved(self, fromIndex: int, toIndex: int):
+        """Reindex the tabs moved with a tab."""
+        self._titles.insert(toIndex, self._titles.pop(fromIndex))
+        self._data.insert(toIndex, self._data.pop(fromIndex))
+        self._reindex(min(fromIndex, toIndex), max(fromIndex, toIndex) + 1)
+
+    def _reindex(self, start: int, stop: int):
+        """Update the indices of the tabs from start to stop in the title and data maps."""
+        for index in range(start, stop):
+            self._titleIndices[self._titles[index]] = index
+            if self._data[index] is not None:
+                self._dataIndices[id(self._data[index])] = index
+
     def currentTabColor(self) -> QColor:
         """Current tab color
 
@@ -90,15 +193,84 @@ class RibbonTabBar(QTabBar):
         return self._tabColors[self.tabText(self.currentIndex())]
 
     def changeColor(self, inx: int) -> None:
-        """Change tab's color."""
-
-        if self.count() > 0:
-            currentTabText = self.tabText(inx)
-            currentTabColor = self._tabColors[currentTabText]
-            if currentTabColor is not None:
-                self.setStyleSheet(
-                    "RibbonTabBar::tab:selected {color: %s;}"
-                    % QColor(currentTabColor).name()
-                )
-            else:
-                self.setStyleSheet("RibbonTabBar::tab:selected {color: black;}")
+        """Change tab's color, the text of the current tab has the color of its category, or black.
+
+        The color is set as the text color of the tab instead of a style sheet, so that the tab bar is not polished
+        again when the current tab changes.
+        """
+        previous = self.indexOf(self._coloredTab) if self._coloredTab is not None else -1
+        if previous >= 0:
+            self.setTabTextColor(previous, QColor())
+        self._coloredTab = None
+        if 0 <= inx < self.count():
+            currentTabText = self.tabText(inx)  # the first tab is current before it is indexed by tabInserted()
+            currentTabColor = self._tabColors.get(currentTabText)
+            self.setTabTextColor(inx, QColor(currentTabColor if currentTabColor is not None else Qt.GlobalColor.black))
+            self._coloredTab = currentTabText
+
+    def _isContextTab(self, index: int) -> bool:
+        """Return whether a tab shows a context category, the tabs added by addAssociatedTabs() or whose data is a
+        context category. The class is checked by name, so that the tab bar does not import the category module.
+        """
+        data = self._data[index]
+        return self._titles[index] in self._associated_tabs or (
+            isinstance(data, QObject) and data.inherits("RibbonContextCategory")
+        )
+
+    def paintEvent(self, event: QPaintEvent) -> None:
+        """Paint the tabs, the tabs of the context categories are tinted with the color of their category, with a
+        band of the color at their top. The other tabs are not marked, even if they have a color.
+        """
+        painter = QPainter(self)
+        for index, title in enumerate(self._titles):
+            color = self._tabColors.get(title)
+            if color is None or not self._isContextTab(index):
+                continue
+            if self._tabVisibilitySupported and not self.isTabVisible(index):
+                continue
+            color = QColor(color)
+            rect = self.tabRect(index).adjusted(0, self._contextCategoryTopMargin, 0, 0)
+            painter.fillRect(rect.x(), rect.y(), rect.width(), self._contextCategoryDarkColorHeight, color)
+            color.setAlpha(self._contextCategoryTintAlpha)
+            painter.fillRect(rect.adjusted(0, self._contextCategoryDarkColorHeight, 0, 0), color)
+        painter.end()
+        colored = self.indexOf(self._coloredTab) if self._coloredTab is not None else -1
+        if colored >= 0 and self.style().inherits("QStyleSheetStyle"):
+            self._paintTabs(event, colored)
+        else:
+            super().paintEvent(event)
+
+    def _paintTabs(self, event: QPaintEvent, colored: int) -> None:
+        """Draw the tabs like QTabBar.paintEvent(), the label of the colored tab is drawn with its text color.
+
+        The color rules of the style sheets override the text colors of the tabs, so the text of the colored tab is
+        drawn apart when the tab bar is styled with a style sheet.
+
+        :param event: The paint event.
+        :param colored: The index of the colored tab.
+        """
+        painter = QStylePainter(self)
+        current = self.currentIndex()
+        for index in [i for i in range(self.count()) if i != current] + ([current] if current >= 0 else []):
+            if self._tabVisibilitySupported and not self.isTabVisible(index):
+                continue
+            option = QStyleOptionTab()
+            self.initStyleOption(option, index)
+            if not option.rect.intersects(event.rect()):
+                continue
+            painter.drawControl(QStyle.ControlElement.CE_TabBarTabShape, option)
+            if index != colored:
+                painter.drawControl(QStyle.ControlElement.CE_TabBarTabLabel, option)
+                continue
+            text, option.text = option.text, ""
+            painter.drawControl(QStyle.ControlElement.CE_TabBarTabLabel, option)
+            option.palette.setColor(QPalette.ColorRole.WindowText, self.tabTextColor(index))
+            self.style().drawItemText(
+                painter,
+                self.style().subElementRect(QStyle.SubElement.SE_TabBarTabText, option, self),
+                Qt.AlignmentFlag.AlignCenter | Qt.TextFlag.TextShowMnemonic,
+                option.palette,
+                bool(option.state & QStyle.StateFlag.State_Enabled),
+                text,
+                QPalette.ColorRole.WindowText,
+            )
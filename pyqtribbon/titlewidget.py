@@ -19,6 +19,7 @@ from PySide.QtCore import (
 )
 
 from .menu import RibbonMenu
+from .style import RibbonProxyStyle
 from .tabbar import RibbonTabBar
 from .utils import DataFile
 
@@ -32,6 +33,7 @@ class RibbonApplicationButton(QToolButton):
         :return: The new ribbon menu.
         """
         menu = RibbonMenu(self)
+        RibbonProxyStyle.inherit(menu)
         self.setPopupMode(QToolButton.ToolButtonPopupMode.InstantPopup)
         self.setMenu(menu)
         return menu
@@ -1,4 +1,4 @@
-from PySide.QtWidgets import QToolButton
+from PySide.QtWidgets import QStyle, QStyleOptionToolButton, QToolButton
 from PySide.QtCore import (
     Qt,
     QSize,
@@ -100,6 +100,54 @@ class RibbonToolButton(QToolButton):
                 """
             )
 
+    def buttonStyleSizeHint(self, style: RibbonButtonStyle, toolButtonStyle: Qt.ToolButtonStyle = None) -> QSize:
+        """Return the size hint of the button at a button style, computed like QToolButton.sizeHint() without
+        changing the style of the button.
+
+        :param style: The button style.
+        :param toolButtonStyle: The tool button style, defaults to the one set by setButtonStyle().
+        :return: The size hint of the button.
+        """
+        if style == self._buttonStyle and toolButtonStyle in (None, self.toolButtonStyle()):
+            return self.sizeHint()
+        height = {
+            RibbonButtonStyle.Small: self._smallButtonIconSize,
+            RibbonButtonStyle.Medium: self._mediumButtonIconSize,
+            RibbonButtonStyle.Large: self._largeButtonIconSize,
+        }[style]
+        height = min(height, self._maximumIconSize)
+        if toolButtonStyle is None:
+            toolButtonStyle = (
+                Qt.ToolButtonStyle.ToolButtonTextUnderIcon
+                if style == RibbonButtonStyle.Large
+                else Qt.ToolButtonStyle.ToolButtonTextBesideIcon
+            )
+        option = QStyleOptionToolButton()
+        self.initStyleOption(option)
+        option.iconSize = QSize(height, height)
+        option.toolButtonStyle = toolButtonStyle
+        if self.icon().isNull() and self.arrowType() == Qt.ArrowType.NoArrow:
+            option.toolButtonStyle = (
+                Qt.ToolButtonStyle.ToolButtonTextOnly if self.text() else Qt.ToolButtonStyle.ToolButtonIconOnly
+            )
+        width = height = 0
+        if option.toolButtonStyle != Qt.ToolButtonStyle.ToolButtonTextOnly:
+            width = height = option.iconSize.width()
+        if option.toolButtonStyle != Qt.ToolButtonStyle.ToolButtonIconOnly:
+            metrics = self.fontMetrics()
+            textSize = metrics.size(Qt.TextFlag.TextShowMnemonic, self.text())
+            textWidth, textHeight = textSize.width() + metrics.horizontalAdvance(" ") * 2, textSize.height()
+            if option.toolButtonStyle == Qt.ToolButtonStyle.ToolButtonTextUnderIcon:
+                width, height = max(width, textWidth), height + 4 + textHeight
+            elif option.toolButtonStyle == Qt.ToolButtonStyle.ToolButtonTextBesideIcon:
+                width, height = width + 4 + textWidth, max(height, textHeight)
+            else:
+                width, height = textWidth, textHeight
+        option.rect.setSize(QSize(width, height))
+        if self.popupMode() == QToolButton.ToolButtonPopupMode.MenuButtonPopup:
+            width += self.style().pixelMetric(QStyle.PixelMetric.PM_MenuButtonIndicator, option, self)
+        return self.style().sizeFromContents(QStyle.ContentsType.CT_ToolButton, option, QSize(width, height), self)
+
     def buttonStyle(self) -> RibbonButtonStyle:
         """Get the button style of the button.
 
@@ -1,4 +1,19 @@
+import contextlib
 import os
+import pkgutil
+import typing
+
+from PySide.QtCore import Qt
+from PySide.QtWidgets import QLayout, QWidget
+
+try:
+    from importlib.resources import files as resourceFiles
+except ImportError:  # Python 3.8
+    resourceFiles = None
+
+#: The texts of the files read by readDataFile() and readFile(), by (kind, name), with the modification time of
+#: the files read from a path
+_fileTexts: typing.Dict[typing.Tuple[str, str], typing.Tuple[typing.Optional[float], str]] = {}
 
 
 def DataFile(filename):
@@ -8,3 +23,74 @@ def DataFile(filename):
     :return: The path to the data file.
     """
     return os.path.join(os.path.dirname(__file__), filename)
+
+
+def readDataFile(filename: str) -> str:
+    """Return the text of a data file of the package, e.g. a style sheet.
+
+    The file is read once per process through importlib.resources, so that it can be read from a zipped package.
+
+    :param filename: The filename of the data file, relative to the package.
+    :return: The text of the data file.
+    """
+    text = _fileTexts.get(("data", filename))
+    if text is None:
+        if resourceFiles is not None:
+            data = resourceFiles(__package__).joinpath(filename).read_text(encoding="utf-8")
+        else:
+            data = pkgutil.get_data(__package__, filename).decode("utf-8")
+        text = _fileTexts[("data", filename)] = (None, data)
+    return text[1]
+
+
+def readFile(path: str) -> str:
+    """Return the text of a file, e.g. a custom style sheet. The text is cached and the file is only read again
+    when its modification time changes.
+
+    :param path: The path of the file.
+    :return: The text of the file.
+    """
+    path = os.path.abspath(path)
+    mtime = os.path.getmtime(path)
+    text = _fileTexts.get(("path", path))
+    if text is None or text[0] != mtime:
+        with open(path, "r", encoding="utf-8") as file:
+            text = _fileTexts[("path", path)] = (mtime, file.read())
+    return text[1]
+
+
+def clearFileCache():
+    """Clear the texts cached by readDataFile() and readFile()."""
+    _fileTexts.clear()
+
+
+@contextlib.contextmanager
+def suspendUpdates(widget: QWidget, *layouts: QLayout):
+    """Suspend the repaint of a widget and the activation of its layouts in the context.
+
+    Nested contexts on the same widget are merged into the outermost one, which activates the layouts once and
+    repaints the widget on exit.
+
+    :param widget: The widget to suspend.
+    :param layouts: The layouts of the widget to suspend.
+    """
+    depth = getattr(widget, "_batchUpdateDepth", 0)
+    widget._batchUpdateDepth = depth + 1
+    if depth == 0:
+        # updatesEnabled() is also False when the updates of a parent are disabled, only restore the explicit state
+        updatesEnabled = not widget.testAttribute(Qt.WidgetAttribute.WA_ForceUpdatesDisabled)
+        layoutsEnabled = [layout.isEnabled() for layout in layouts]
+        widget.setUpdatesEnabled(False)
+        for layout in layouts:
+            layout.setEnabled(False)
+    try:
+        yield
+    finally:
+        widget._batchUpdateDepth = depth
+        if depth == 0:
+            for layout, enabled in zip(layouts, layoutsEnabled):
+                layout.setEnabled(enabled)
+            for layout in layouts:
+                layout.activate()
+            widget.setUpdatesEnabled(updatesEnabled)
+            widget.update()
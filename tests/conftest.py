@@ -0,0 +1,27 @@
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--benchmark-large",
+        action="store_true",
+        default=False,
+        help="Run the benchmarks with a large number of widgets as well.",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "large: benchmark with a large number of widgets, run with --benchmark-large")
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip the benchmarks unless they are requested, and the large benchmarks unless --benchmark-large is given."""
+    benchmarks = config.getoption("benchmark_enable", False) or config.getoption("benchmark_only", False)
+    large = config.getoption("benchmark_large")
+    for item in items:
+        if "benchmark" not in getattr(item, "fixturenames", ()):
+            continue
+        if not benchmarks:
+            item.add_marker(pytest.mark.skip(reason="run the benchmarks with --benchmark-enable or --benchmark-only"))
+        elif item.get_closest_marker("large") is not None and not large:
+            item.add_marker(pytest.mark.skip(reason="run the large benchmarks with --benchmark-large"))
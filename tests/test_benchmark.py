@@ -0,0 +1,132 @@
+"""Benchmarks of the panel grid placement.
+
+The benchmarks are skipped by default, run them with ``pytest tests/test_benchmark.py --benchmark-only``, and add
+``--benchmark-large`` to run the cases with 10,000 widgets as well. The extra info of a run reports:
+
+- ``python_peak_memory``: the peak of the Python heap traced by tracemalloc, the memory of the Qt objects is not
+  included;
+- ``rss_increase``: the increase of the resident memory of the process, Qt objects included, measured with psutil
+  when it is installed, or else from the peak resident memory given by the resource module.
+"""
+
+import random
+import sys
+import tracemalloc
+
+import pytest
+from pytestqt.qtbot import QtBot
+from qtpy import QtWidgets
+
+from pyqtribbon import ColumnWise, Large, Medium, RowWise, Small
+from pyqtribbon.panel import RibbonGridLayoutManager, RibbonPanel
+
+pytest.importorskip("pytest_benchmark")
+
+counts = [10, 100, 1000, pytest.param(10000, marks=pytest.mark.large)]
+modes = [ColumnWise, RowWise]
+
+
+def mixedSpans(count: int):
+    """Return a reproducible mix of small, medium and large spans."""
+    return random.Random(count).choices([Small, Medium, Large], weights=[3, 2, 1], k=count)
+
+
+def residentMemory() -> int:
+    """Return the resident memory of the process in bytes, the peak resident memory when psutil is not installed."""
+    try:
+        import psutil
+    except ImportError:
+        import resource
+
+        # ru_maxrss is given in kilobytes on Linux, and in bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    return psutil.Process().memory_info().rss
+
+
+def measureMemory(benchmark, function, *args):
+    """Run the function once and report its memory usage in the extra info of the benchmark."""
+    rss = residentMemory()
+    tracemalloc.start()
+    try:
+        function(*args)
+        benchmark.extra_info["python_peak_memory"] = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    benchmark.extra_info["rss_increase"] = residentMemory() - rss
+
+
+@pytest.mark.parametrize("mode", modes, ids=lambda mode: mode.name)
+@pytest.mark.parametrize("count", counts)
+def test_grid_layout_manager(benchmark, count, mode):
+    rowSpans = [{Small: 2, Medium: 3, Large: 6}[span] for span in mixedSpans(count)]
+
+    def place():
+        manager = RibbonGridLayoutManager(6)
+        for rowSpan in rowSpans:
+            manager.request_cells(rowSpan, 1, mode)
+        return manager
+
+    measureMemory(benchmark, place)
+    manager = benchmark(place)
+    assert len(manager._regions) == count
+
+
+@pytest.mark.parametrize("count", counts)
+def test_grid_layout_manager_holes(benchmark, count):
+    """Place one-row widgets into the holes left at the last row of the columns by five-row widgets."""
+
+    def setup():
+        manager = RibbonGridLayoutManager(6)
+        for _ in range(count):
+            manager.request_cells(5, 1, ColumnWise)
+        return (manager,), {}
+
+    def place(manager):
+        for _ in range(count):
+            manager.request_cells(1, 1, ColumnWise)
+        return manager
+
+    measureMemory(benchmark, place, *setup()[0])
+    manager = benchmark.pedantic(place, setup=setup, rounds=1 if count >= 10000 else 3)
+    assert manager.columns == count and all(row == 5 for row, _ in list(manager._regions)[count:])
+
+
+@pytest.mark.parametrize("mode", modes, ids=lambda mode: mode.name)
+@pytest.mark.parametrize("count", counts)
+def test_panel_add_widget(benchmark, qtbot: QtBot, count, mode):
+    spans = mixedSpans(count)
+
+    def setup():
+        panel = RibbonPanel("Panel", 6)
+        qtbot.addWidget(panel)
+        return (panel, [QtWidgets.QToolButton() for _ in spans]), {}
+
+    def add(panel, widgets):
+        for widget, span in zip(widgets, spans):
+            panel.addWidget(widget, rowSpan=span, mode=mode)
+        # addWidgets() lays out the panel before it returns, do the same work here
+        panel.layout().activate()
+        return panel
+
+    measureMemory(benchmark, add, *setup()[0])
+    panel = benchmark.pedantic(add, setup=setup, rounds=1 if count >= 10000 else 3)
+    assert len(panel.widgets()) == count
+
+
+@pytest.mark.parametrize("mode", modes, ids=lambda mode: mode.name)
+@pytest.mark.parametrize("count", counts)
+def test_panel_add_widgets(benchmark, qtbot: QtBot, count, mode):
+    spans = mixedSpans(count)
+
+    def setup():
+        panel = RibbonPanel("Panel", 6)
+        qtbot.addWidget(panel)
+        return (panel, [(QtWidgets.QToolButton(), {"rowSpan": span, "mode": mode}) for span in spans]), {}
+
+    def add(panel, widgets):
+        panel.addWidgets(widgets)
+        return panel
+
+    measureMemory(benchmark, add, *setup()[0])
+    panel = benchmark.pedantic(add, setup=setup, rounds=1 if count >= 10000 else 3)
+    assert len(panel.widgets()) == count
@@ -1,7 +1,9 @@
+import pytest
 from pytestqt.qtbot import QtBot
 from qtpy import QtWidgets
 
-from pyqtribbon import RibbonBar
+from pyqtribbon import Large, RibbonBar, RibbonPanelStage
+from pyqtribbon.separator import RibbonSeparator
 
 
 def test_category(qtbot: QtBot):
@@ -21,3 +23,162 @@ def test_category(qtbot: QtBot):
 
     # Show the window
     window.resize(1800, 350)
+
+
+def test_adaptive_layout(qtbot: QtBot):
+    ribbonbar = RibbonBar()
+    qtbot.addWidget(ribbonbar)
+    category = ribbonbar.addCategory("Category 1")
+    for index in range(6):
+        panel = category.addPanel(f"Panel {index}")
+        panel.addLargeButton("Large 1")
+        panel.addLargeButton("Large 2")
+        panel.addMediumButton("Medium 1")
+        panel.addSmallButton("Small 1")
+    ribbonbar.resize(2000, ribbonbar.height())
+    ribbonbar.show()
+    qtbot.waitExposed(ribbonbar)
+    category.setAdaptiveLayout(True)
+    panels = list(category.panels().values())
+    assert all(panel.stage() == RibbonPanelStage.Large for panel in panels)
+
+    large = panels[0].stageWidth(RibbonPanelStage.Large)
+    assert panels[0].stageWidth(RibbonPanelStage.Medium) < large
+    ribbonbar.resize(large * 4, ribbonbar.height())
+    qtbot.waitUntil(lambda: panels[-1].stage() != RibbonPanelStage.Large)
+    stages = [panel.stage() for panel in panels]
+    assert stages == sorted(stages)
+    assert category._categoryScrollAreaContents.sizeHint().width() <= category.width()
+
+    panels[-1].setStage(RibbonPanelStage.Collapsed)
+    assert panels[-1]._collapsedButton.isVisibleTo(panels[-1])
+    assert panels[-1].widgets()[0].parentWidget().window() is panels[-1]._popup
+
+    ribbonbar.resize(2000, ribbonbar.height())
+    qtbot.waitUntil(lambda: all(panel.stage() == RibbonPanelStage.Large for panel in panels))
+    assert panels[-1].widgets()[0].buttonStyle() == Large
+
+
+def test_stage_widths(qtbot: QtBot):
+    ribbonbar = RibbonBar()
+    qtbot.addWidget(ribbonbar)
+    category = ribbonbar.addCategory("Category 1")
+    panel = category.addPanel("Panel 1")
+    panel.addLargeButton("Large button")
+    panel.addLargeButton("Icon only", showText=False)
+    panel.addMediumButton("Medium 1")
+    panel.addMediumButton("Medium 2")
+    panel.addSmallButton("Small 1")
+    panel.addVerticalSeparator()
+    lazy = ribbonbar.addCategory("Category 2").addPanel("Panel 2")
+    lazy.addWidgetsBy({"button": {"type": "LargeButton", "args": ("Large button",)}}, lazy=True)
+    ribbonbar.show()
+    qtbot.waitExposed(ribbonbar)
+
+    styles = [widget.buttonStyle() for widget in panel.widgets() if hasattr(widget, "buttonStyle")]
+    widths = {stage: panel.stageWidth(stage) for stage in RibbonPanelStage}
+    assert panel.stage() == RibbonPanelStage.Large
+    assert [widget.buttonStyle() for widget in panel.widgets() if hasattr(widget, "buttonStyle")] == styles
+    for stage in RibbonPanelStage:
+        panel.setStage(stage)
+        panel.layout().invalidate()
+        assert widths[stage] == panel.sizeHint().width()
+
+    # the widgets of a lazy panel are not constructed to measure the panel
+    lazy.stageWidth(RibbonPanelStage.Medium)
+    assert lazy._lazyWidgets
+
+
+def test_scroll_buttons(qtbot: QtBot):
+    ribbonbar = RibbonBar()
+    qtbot.addWidget(ribbonbar)
+    category = ribbonbar.addCategory("Category 1")
+    category.addPanel("Panel 1").addLargeButton("Large 1")
+    ribbonbar.resize(800, ribbonbar.height())
+    ribbonbar.show()
+    qtbot.waitExposed(ribbonbar)
+    assert not category._previousButton.isVisible() and not category._nextButton.isVisible()
+
+    for index in range(2, 12):
+        panel = category.addPanel(f"Panel {index}")
+        panel.addLargeButton("Large 1")
+        panel.addLargeButton("Large 2")
+    qtbot.waitUntil(lambda: category._nextButton.isVisible())
+    assert not category._previousButton.isVisible()
+
+    category.scrollNext()
+    assert category._previousButton.isVisible()
+    category._categoryScrollArea.horizontalScrollBar().setValue(0)
+    assert not category._previousButton.isVisible() and category._nextButton.isVisible()
+
+    ribbonbar.resize(4000, ribbonbar.height())
+    qtbot.waitUntil(lambda: not category._nextButton.isVisible())
+
+
+def test_painted_separators(qtbot: QtBot):
+    ribbonbar = RibbonBar()
+    qtbot.addWidget(ribbonbar)
+    category = ribbonbar.addCategory("Category 1")
+    for index in range(3):
+        category.addPanel(f"Panel {index}").addLargeButton("Large 1")
+    ribbonbar.show()
+    qtbot.waitExposed(ribbonbar)
+    layout = category._categoryLayout
+    assert len(category.findChildren(RibbonSeparator)) == 3
+
+    category.setPanelSeparatorsPainted(True)
+    category.addPanel("Panel 3").addLargeButton("Large 1")
+    qtbot.waitUntil(lambda: not category.findChildren(RibbonSeparator))
+    assert layout.count() == 8
+    assert [layout.itemAt(index).spacerItem() is not None for index in range(8)] == [False, True] * 4
+    assert len(category._categoryScrollAreaContents._separators) == 4
+    qtbot.waitUntil(
+        lambda: all(
+            layout.itemAt(index + 1).geometry().left() == layout.itemAt(index).widget().geometry().right() + 1
+            and layout.itemAt(index + 1).geometry().width() == 10
+            for index in range(0, 8, 2)
+        )
+    )
+    category._categoryScrollAreaContents.grab()
+
+    category.setPanelSeparatorsPainted(False)
+    assert category._categoryScrollAreaContents._separators == []
+    assert [isinstance(layout.itemAt(index).widget(), RibbonSeparator) for index in range(8)] == [False, True] * 4
+
+
+def test_panel_order(qtbot: QtBot):
+    ribbonbar = RibbonBar()
+    qtbot.addWidget(ribbonbar)
+    category = ribbonbar.addCategory("Category 1")
+    layout = category._categoryLayout
+
+    def layoutTitles():
+        widgets = [layout.itemAt(index).widget() for index in range(layout.count())]
+        assert all(isinstance(widget, RibbonSeparator) for widget in widgets[1::2])
+        return [widget.title() for widget in widgets[::2]]
+
+    for title in ["A", "B", "C"]:
+        category.addPanel(title)
+    category.insertPanel(1, "D")
+    category.insertPanel(10, "E")
+    assert list(category.panels()) == layoutTitles() == ["A", "D", "B", "C", "E"]
+
+    category.movePanel("A", 3)
+    assert list(category.panels()) == layoutTitles() == ["D", "B", "C", "A", "E"]
+    category.movePanel("E", 0)
+    assert list(category.panels()) == layoutTitles() == ["E", "D", "B", "C", "A"]
+
+    category.setPanelSeparatorsPainted(True)
+    category.setPanelOrder(["A", "B", "C", "D", "E"])
+    assert list(category.panels()) == ["A", "B", "C", "D", "E"]
+    assert [layout.itemAt(index).spacerItem() is not None for index in range(10)] == [False, True] * 5
+    assert [layout.itemAt(index).widget().title() for index in range(0, 10, 2)] == ["A", "B", "C", "D", "E"]
+    with pytest.raises(ValueError):
+        category.setPanelOrder(["A", "B"])
+    with pytest.raises(ValueError):
+        category.addPanel("A")
+
+    category.setPanelSeparatorsPainted(False)
+    category.removePanel("C")
+    assert layout.count() == 8
+    assert layoutTitles() == ["A", "B", "D", "E"]
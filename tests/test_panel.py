@@ -1,7 +1,9 @@
+import pytest
 from pytestqt.qtbot import QtBot
-from qtpy import QtWidgets
+from qtpy import QtCore, QtGui, QtWidgets
 
-from pyqtribbon import RibbonBar
+from pyqtribbon import ColumnWise, Large, Medium, NumPy, RibbonBar, RowWise, Small
+from pyqtribbon.panel import RibbonGridLayoutManager, RibbonPanel, RibbonPanelItemWidget, RibbonWidgetsSpec
 
 
 def test_panel(qtbot: QtBot):
@@ -33,3 +35,284 @@ def test_panel(qtbot: QtBot):
 
     # Show the window
     window.resize(1800, 350)
+
+
+def test_grid_layout_manager_capacity():
+    manager = RibbonGridLayoutManager(6)
+    capacities = set()
+    for i in range(100):
+        assert manager.request_cells(6, 1) == (0, i)
+        capacities.add(manager.capacity())
+    assert manager.columns == 100
+    assert len(manager.cells) == 6
+    assert all(len(row) == 100 and not any(row) for row in manager.cells)
+    # the cell matrix is grown geometrically, not once per column
+    assert len(capacities) <= 5
+
+
+def test_grid_layout_manager_fills_holes():
+    manager = RibbonGridLayoutManager(6)
+    assert manager.request_cells(3, 1) == (0, 0)  # medium
+    assert manager.request_cells(2, 1) == (3, 0)  # small, leaves a one-row hole in column 0
+    assert manager.request_cells(6, 1) == (0, 1)  # large
+    assert manager.request_cells(2, 1) == (0, 2)
+    assert manager.request_cells(2, 1) == (2, 2)
+    assert manager.request_cells(2, 1) == (4, 2)
+    # only column 0 still has an available row, the full columns are not searched
+    assert manager._fitColumns[1] == {0}
+    assert manager.request_cells(1, 1) == (5, 0)
+    assert manager._fitColumns[1] == set()
+
+
+def test_add_widgets(qtbot: QtBot):
+    ribbonbar = RibbonBar()
+    qtbot.addWidget(ribbonbar)
+    category = ribbonbar.addCategory("Category 1")
+    panel1 = category.addPanel("Panel 1")
+    panel2 = category.addPanel("Panel 2")
+
+    spans = [Small, Small, Medium, Large, Small, Medium, Medium, Small]
+    widgets1 = [panel1.addWidget(QtWidgets.QLabel(f"Label {i}"), rowSpan=span) for i, span in enumerate(spans)]
+    widgets2 = panel2.addWidgets([(QtWidgets.QLabel(f"Label {i}"), {"rowSpan": span}) for i, span in enumerate(spans)])
+    assert panel2.widgets() == widgets2
+
+    def positions(panel, widgets):
+        layout = panel._actionsLayout
+        return [layout.getItemPosition(layout.indexOf(widget.parentWidget())) for widget in widgets]
+
+    assert positions(panel1, widgets1) == positions(panel2, widgets2)
+    assert RibbonGridLayoutManager(6).request_many([]) == []
+
+
+def test_remove_widget(qtbot: QtBot):
+    ribbonbar = RibbonBar()
+    qtbot.addWidget(ribbonbar)
+    panel = ribbonbar.addCategory("Category 1").addPanel("Panel 1")
+
+    buttons = [panel.addLargeButton(f"Button {i}") for i in range(3)]
+    assert panel._gridLayoutManager.columns == 3
+    panel.removeWidget(buttons[1])
+    assert buttons[1] not in panel.widgets()
+    assert buttons[1].parent() is None
+    # the released cells are reused by the next widget
+    button = panel.addLargeButton("Button 3")
+    assert panel._placements[button].col == 1
+    assert panel._gridLayoutManager.columns == 3
+
+    # removing the last widgets shrinks the grid
+    panel.removeWidget(buttons[2])
+    assert panel._gridLayoutManager.columns == 2
+
+    panel.removeWidget(buttons[0])
+    panel.compact()
+    assert [panel._placements[widget].col for widget in panel.widgets()] == [0]
+    assert panel._gridLayoutManager.columns == 1
+
+
+def test_grid_layout_manager_backends():
+    numpy = pytest.importorskip("numpy")
+    bitset = RibbonGridLayoutManager(6)
+    array = RibbonGridLayoutManager(6, NumPy)
+    for rowSpan, colSpan, mode in [(2, 1, ColumnWise), (3, 2, ColumnWise), (6, 1, RowWise), (2, 1, ColumnWise)]:
+        assert bitset.request_cells(rowSpan, colSpan, mode) == array.request_cells(rowSpan, colSpan, mode)
+    assert isinstance(array.cells, numpy.ndarray)
+    assert array.cells.tolist() == bitset.cells
+
+
+def test_grid_layout_manager_plan_cache():
+    RibbonGridLayoutManager.clear_plan_cache()
+    requests = [(2, 1, ColumnWise), (3, 1, ColumnWise), (6, 2, ColumnWise), (2, 1, RowWise), (2, 1, ColumnWise)]
+    expected = RibbonGridLayoutManager(6)
+    positions = [expected.request_cells(*request) for request in requests]
+
+    first = RibbonGridLayoutManager(6)
+    assert first.request_many(requests) == positions
+    second = RibbonGridLayoutManager(6)
+    assert second.request_many(requests) == positions
+    assert second.cells == expected.cells
+    assert second.request_cells(2, 1) == expected.request_cells(2, 1)
+
+    info = RibbonGridLayoutManager.plan_cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_flat_layout(qtbot: QtBot):
+    ribbonbar = RibbonBar()
+    qtbot.addWidget(ribbonbar)
+    panel = ribbonbar.addCategory("Category 1").addPanel("Panel 1")
+    panel.setFlatLayout(True)
+    assert panel.flatLayout()
+
+    button = panel.addSmallButton("Button 1")
+    assert button.parentWidget() is panel
+    assert panel._actionsLayout.indexOf(button) >= 0
+    assert not panel.findChildren(RibbonPanelItemWidget)
+
+    panel.removeWidget(button)
+    assert panel._actionsLayout.indexOf(button) == -1
+    assert button.parentWidget() is None
+
+
+def test_row_metrics_follow_resize(qtbot: QtBot):
+    ribbonbar = RibbonBar()
+    qtbot.addWidget(ribbonbar)
+    panel = ribbonbar.addCategory("Category 1").addPanel("Panel 1")
+    button = panel.addLargeButton("Button 1")
+    gallery = panel.addGallery()
+    rowHeight = panel.rowHeight()
+    assert button.maximumHeight() == rowHeight * 6 + panel._actionsLayout.verticalSpacing() * 4
+    assert gallery.height() == gallery.maximumHeight() == button.maximumHeight()
+
+    panel.setFixedHeight(panel.height() + 60)
+    maximumHeight = button.maximumHeight()
+    assert panel.rowHeight() == rowHeight + 10
+    assert button.maximumHeight() == maximumHeight  # rowHeight() does not change the widgets
+    panel.resizeEvent(QtGui.QResizeEvent(panel.size(), panel.size() - QtCore.QSize(0, 60)))
+    assert panel.rowHeight() == rowHeight + 10
+    assert button.maximumHeight() == panel.rowHeight() * 6 + panel._actionsLayout.verticalSpacing() * 4
+    assert gallery.maximumHeight() == button.maximumHeight()
+
+
+def test_sized_methods(qtbot: QtBot):
+    ribbonbar = RibbonBar()
+    qtbot.addWidget(ribbonbar)
+    panel = ribbonbar.addCategory("Category 1").addPanel("Panel 1")
+    assert "addMediumComboBox" in vars(RibbonPanel)
+    comboBox = panel.addMediumComboBox(["Item 1", "Item 2"])
+    assert panel._placements[comboBox].rowSpan == panel.defaultRowSpan(Medium)
+    assert not hasattr(panel, "addSmallUnknownWidget")
+    with pytest.raises(AttributeError):
+        panel.unknownAttribute
+
+    class Panel(RibbonPanel):
+        def addSpacer(self, rowSpan=Small):
+            return self.addWidget(QtWidgets.QWidget(), rowSpan=rowSpan)
+
+    panel = Panel("Panel 2")
+    qtbot.addWidget(panel)
+    assert panel._placements[panel.addLargeSpacer()].rowSpan == panel.defaultRowSpan(Large)
+
+
+def test_lazy_widgets(qtbot: QtBot):
+    def spec():
+        return {
+            "Button 1": {"type": "Button", "kwargs": {"text": "Button 1"}},
+            "Button 2": {"type": "Button", "kwargs": {"text": "Button 2", "rowSpan": Small}},
+            "Combo Box": {"type": "ComboBox", "args": (["Item 1", "Item 2"],)},
+            "Separator": {"type": "Separator"},
+            "Gallery": {"type": "Gallery", "kwargs": {"rowSpan": Medium}},
+        }
+
+    ribbonbar = RibbonBar()
+    qtbot.addWidget(ribbonbar)
+    category = ribbonbar.addCategory("Category 1")
+    eager = category.addPanel("Eager")
+    eagerWidgets = eager.addWidgetsBy(spec())
+    eager.addSmallButton("Button 3")
+
+    lazy = category.addPanel("Lazy")
+    lazyWidgets = lazy.addWidgetsBy(spec(), lazy=True)
+    button = lazy.addSmallButton("Button 3")
+    assert lazyWidgets == {}
+    assert lazy.widgets() == [button]
+    assert len(lazy._gridLayoutManager._regions) == 6
+
+    ribbonbar.show()
+    qtbot.waitExposed(ribbonbar)
+    assert list(lazyWidgets) == list(eagerWidgets)
+    assert len(lazy.widgets()) == 6
+    for key, widget in lazyWidgets.items():
+        placement, eagerPlacement = lazy._placements[widget], eager._placements[eagerWidgets[key]]
+        assert (placement.row, placement.col, placement.rowSpan) == (
+            eagerPlacement.row,
+            eagerPlacement.col,
+            eagerPlacement.rowSpan,
+        )
+    eagerButton = eager._placements[eager.widgets()[-1]]
+    assert (lazy._placements[button].row, lazy._placements[button].col) == (eagerButton.row, eagerButton.col)
+    assert len(lazy._gridLayoutManager._regions) == 6
+
+
+def test_widgets_spec(qtbot: QtBot):
+    data = {
+        "Button 1": {"type": "Button", "kwargs": {"text": "Button 1"}},
+        "Combo Box": {"type": "ComboBox", "args": (["Item 1", "Item 2"],), "kwargs": {"rowSpan": Small}},
+        "Gallery": {"type": "Gallery", "kwargs": {"rowSpan": Medium}},
+    }
+    panel1 = RibbonPanel("Panel 1")
+    qtbot.addWidget(panel1)
+    widgets1 = panel1.addWidgetsBy(data)
+    assert data["Button 1"] == {"type": "Button", "kwargs": {"text": "Button 1"}}
+
+    spec = RibbonWidgetsSpec(data)
+    assert spec.keys() == list(data)
+    panels = [RibbonPanel(f"Panel {i}") for i in range(2, 4)]
+    for panel in panels:
+        qtbot.addWidget(panel)
+        widgets = panel.addWidgetsBy(spec)
+        assert list(widgets) == list(widgets1)
+        assert isinstance(widgets["Combo Box"], QtWidgets.QComboBox)
+        assert widgets["Combo Box"].count() == 2
+        assert panel._placements[widgets["Gallery"]].rowSpan == panel1._placements[widgets1["Gallery"]].rowSpan
+    assert len(spec._methods) == 1
+    assert not spec._spans
+    assert RibbonWidgetsSpec.compile(dict(data)) is not RibbonWidgetsSpec.compile(data)  # the args hold a list
+    immutable = {"Combo Box": {"type": "ComboBox", "args": (("Item 1", "Item 2"),), "kwargs": {"rowSpan": Small}}}
+    assert RibbonWidgetsSpec.compile(dict(immutable)) is RibbonWidgetsSpec.compile(immutable)
+    assert RibbonWidgetsSpec.compile({"Button 1": {"type": "Button", "kwargs": {"text": "Button 2"}}}) is not (
+        RibbonWidgetsSpec.compile({"Button 1": {"type": "Button", "kwargs": {"text": "Button 1"}}})
+    )
+
+    # a compiled dict does not keep the lists of the caller
+    items = ["Item 1"]
+    panel = RibbonPanel("Panel 4")
+    qtbot.addWidget(panel)
+    panel.addWidgetsBy({"Combo Box": {"type": "ComboBox", "args": (items,)}})
+    items.append("Item 2")
+    assert panel.addWidgetsBy({"Combo Box": {"type": "ComboBox", "args": (["Item 1"],)}})["Combo Box"].count() == 1
+
+    panel = RibbonPanel("Panel 5")
+    qtbot.addWidget(panel)
+    panel.addCustom = lambda text, rowSpan=Large: panel.addButton(text, rowSpan=rowSpan)
+    widgets = panel.addWidgetsBy({"Custom": {"type": "SmallCustom", "args": ("Custom",)}})
+    assert widgets["Custom"].text() == "Custom"
+    with pytest.raises(AssertionError):
+        panel.addWidgetsBy({"Missing": {"type": "Missing"}})
+
+
+def test_widget_pool(qtbot: QtBot):
+    ribbonbar = RibbonBar()
+    qtbot.addWidget(ribbonbar)
+    pool = ribbonbar.widgetPool()
+    panel = ribbonbar.addCategory("Category 1").addPanel("Panel 1")
+    assert panel.widgetPool() is pool
+    clicked = []
+    button = panel.addSmallButton("Button 1", slot=lambda: clicked.append(1), checkable=True)
+    button.setObjectName("button1")
+    panel.addLargeButton("Button 2")
+    panel.addLineEdit()
+    panel.addWidgetsBy({"Lazy": {"type": "Button"}}, lazy=True)
+    panel.clear()
+    assert panel.widgets() == [] and panel._lazyWidgets == []
+    assert panel._gridLayoutManager._regions == {}
+    assert pool.size() == 5  # two buttons and their items, and the item of the line edit
+    assert ribbonbar.commands("button1") == []
+
+    reused = panel.addSmallButton("Button 3")
+    assert reused is button
+    assert panel.widgets() == [reused]
+    assert reused.text() == "Button 3" and not reused.isCheckable() and reused.objectName() == ""
+    reused.click()
+    assert clicked == []
+    assert panel.addMediumButton("Button 4") is not button
+
+    assert pool.size() == 2
+    panel.clear()
+    assert pool.size() == 6
+    pool.setMaximumSizePerKey(1)
+    assert pool.size() == 4  # one item, and one button of each style
+    pool.setMaximumSize(1)
+    assert pool.size() == 1
+    panel.addSmallButton("Button 5")
+    panel.clear()
+    assert pool.size() == 1
@@ -1,7 +1,12 @@
+import os
+
+import pytest
 from pytestqt.qtbot import QtBot
-from qtpy import QtWidgets
+from qtpy import QtCore, QtGui, QtWidgets
 
-from pyqtribbon import RibbonBar
+from pyqtribbon import RibbonBar, RibbonStyle, RibbonStyleBackend, utils
+from pyqtribbon.style import RibbonProxyStyle
+from pyqtribbon.tabbar import RibbonTabBar
 
 
 def test_ribbonbar(qtbot: QtBot):
@@ -18,3 +23,312 @@ def test_ribbonbar(qtbot: QtBot):
 
     # Show the window
     window.resize(1800, 350)
+
+
+def test_batch_update(qtbot: QtBot):
+    ribbonbar = RibbonBar()
+    qtbot.addWidget(ribbonbar)
+    ribbonbar.show()
+
+    with ribbonbar.batchUpdate():
+        assert not ribbonbar.updatesEnabled()
+        category = ribbonbar.addCategory("Category 1")
+        with category.batchUpdate():
+            panel = category.addPanel("Panel 1")
+            with panel.batchUpdate(), panel.batchUpdate():
+                button = panel.addSmallButton("Button 1")
+                assert button not in panel.widgets()
+            assert button in panel.widgets()
+        with ribbonbar.batchUpdate():
+            pass
+        assert not ribbonbar.updatesEnabled()
+        assert not panel.updatesEnabled()
+
+    assert ribbonbar.updatesEnabled()
+    assert category.updatesEnabled()
+    assert panel.updatesEnabled()
+
+
+def test_commands(qtbot: QtBot):
+    ribbonbar = RibbonBar()
+    qtbot.addWidget(ribbonbar)
+
+    def widgets():
+        return {"Button 1": {"type": "Button", "kwargs": {"text": "Button 1"}}}
+
+    categories = ribbonbar.addCategoriesBy(
+        {
+            "Category 1": {"panels": {"Panel 1": {"widgets": widgets()}, "Panel 2": {"widgets": widgets()}}},
+            "Category 2": {"panels": {"Panel 1": {"widgets": widgets()}}},
+        }
+    )
+    panel1 = categories["Category 1"].panel("Panel 1")
+    button = panel1.widgets()[0]
+    assert ribbonbar.command("Category 1/Panel 1/Button 1") is button
+    assert ribbonbar.command("Panel 1/Button 1") is button
+    assert ribbonbar.command("Button 1") is button
+    assert len(ribbonbar.commands("Button 1")) == 3
+
+    label = panel1.addLabel("Label")
+    label.setObjectName("Label 1")
+    with pytest.raises(KeyError):
+        ribbonbar.command("Label 1")
+    combo = QtWidgets.QComboBox()
+    combo.setObjectName("Combo 1")
+    panel1.addWidget(combo)
+    assert ribbonbar.command("Category 1/Panel 1/Combo 1") is combo
+
+    panel1.setTitle("Panel 3")
+    assert ribbonbar.command("Panel 3/Button 1") is button
+    panel1.removeWidget(button)
+    with pytest.raises(KeyError):
+        ribbonbar.command("Category 1/Panel 3/Button 1")
+    combo.setObjectName("Combo 2")  # the widget is unregistered under the name it was registered with
+    panel1.removeWidget(combo)
+    with pytest.raises(KeyError):
+        ribbonbar.command("Combo 1")
+    categories["Category 1"].removePanel("Panel 2")
+    ribbonbar.removeCategory(categories["Category 2"])
+    assert ribbonbar.commands("Button 1") == []
+
+
+def test_deferred_categories(qtbot: QtBot):
+    ribbonbar = RibbonBar()
+    qtbot.addWidget(ribbonbar)
+    built = []
+
+    def builder(category):
+        built.append(category.title())
+        category.addPanel("Panel 1").addButton("Button 1")
+
+    category1 = ribbonbar.addCategory("Category 1", builder=builder)
+    category2 = ribbonbar.addCategory("Category 2", builder=builder)
+    category3 = ribbonbar.addCategory("Category 3", builder=builder)
+    assert ribbonbar.tabBar().tabTitles() == ["Category 1", "Category 2", "Category 3"]
+    assert built == ["Category 1"]
+    assert not category2.isBuilt() and category2._panels == {}
+
+    ribbonbar.tabBar().setCurrentIndex(1)
+    assert built == ["Category 1", "Category 2"]
+    assert list(category2._panels) == ["Panel 1"]
+    assert list(category3.panels()) == ["Panel 1"]
+    category1.build()
+    assert built == ["Category 1", "Category 2", "Category 3"]
+
+    categories = ribbonbar.addCategoriesBy(
+        {
+            "Category 4": {"panels": {"Panel 1": {"widgets": {"Button 1": {"type": "Button"}}}}},
+            "Category 5": {"panels": {"Panel 1": {"widgets": {"Button 1": {"type": "Button"}}}}},
+        },
+        lazy=True,
+    )
+    assert not categories["Category 4"].isBuilt() and not categories["Category 5"].isBuilt()
+    ribbonbar.buildCategoriesWhenIdle()
+    qtbot.waitUntil(lambda: categories["Category 5"].isBuilt())
+    assert categories["Category 4"].isBuilt()
+    assert len(categories["Category 4"].panel("Panel 1").widgets()) == 1
+
+
+def test_style_sheet_cache(qtbot: QtBot, tmp_path, monkeypatch):
+    utils.clearFileCache()
+    ribbonbar = RibbonBar()
+    qtbot.addWidget(ribbonbar)
+    styleSheet = ribbonbar.styleSheet()
+    assert ("data", "styles/default.qss") in utils._fileTexts
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The style sheets are read again")
+
+    with monkeypatch.context() as context:
+        context.setattr(utils, "resourceFiles", fail)
+        context.setattr(utils.pkgutil, "get_data", fail)
+        other = RibbonBar()
+        qtbot.addWidget(other)
+        assert other.styleSheet() == styleSheet
+
+    path = tmp_path / "custom.qss"
+    path.write_text("RibbonBar { background: red; }")
+    ribbonbar.setRibbonStyle(str(path))
+    assert ribbonbar.styleSheet().endswith("RibbonBar { background: red; }")
+    path.write_text("RibbonBar { background: blue; }")
+    os.utime(path, (0, 0))
+    ribbonbar.setRibbonStyle(str(path))
+    assert ribbonbar.styleSheet().endswith("RibbonBar { background: blue; }")
+    ribbonbar.setRibbonStyle(RibbonStyle.Default)
+    assert ribbonbar.styleSheet() == styleSheet
+
+
+def test_proxy_style_backend(qtbot: QtBot):
+    ribbonbars = []
+    for backend in RibbonStyleBackend:
+        ribbonbar = RibbonBar()
+        qtbot.addWidget(ribbonbar)
+        ribbonbar.setStyleBackend(backend)
+        for title in ("Category 1", "Category 2"):
+            ribbonbar.addCategory(title).addPanel("Panel 1").addLargeButton("Button 1")
+        ribbonbar.show()
+        ribbonbars.append(ribbonbar)
+    sheetRibbon, proxyRibbon = ribbonbars
+    tabRects = [[ribbon.tabBar().tabRect(i) for i in range(ribbon.tabBar().count())] for ribbon in ribbonbars]
+    assert tabRects[0] == tabRects[1]
+
+    assert proxyRibbon.styleBackend() == RibbonStyleBackend.ProxyStyle
+    assert proxyRibbon.styleSheet() == ""
+    style = proxyRibbon.style()
+    assert isinstance(style, RibbonProxyStyle)
+    assert proxyRibbon.categories()["Category 1"].style() is style
+    assert proxyRibbon.tabBar().style() is style
+    gallery = proxyRibbon.addCategory("Category 3").addPanel("Panel 1").addGallery()
+    assert gallery.style() is style
+    assert proxyRibbon.addFileMenu().style() is style
+
+    proxyRibbon.setRibbonStyle(RibbonStyle.Debug)
+    assert proxyRibbon.styleSheet() != ""
+    assert not isinstance(proxyRibbon.categories()["Category 1"].style(), RibbonProxyStyle)
+    assert not isinstance(gallery.style(), RibbonProxyStyle)
+    proxyRibbon.setRibbonStyle(RibbonStyle.Default)
+    assert proxyRibbon.styleSheet() == "" and gallery.style() is style
+    proxyRibbon.setStyleBackend(RibbonStyleBackend.StyleSheet)
+    assert proxyRibbon.styleSheet() == sheetRibbon.styleSheet()
+    assert not isinstance(gallery.style(), RibbonProxyStyle)
+
+
+def test_tab_indices(qtbot: QtBot):
+    ribbonbar = RibbonBar()
+    qtbot.addWidget(ribbonbar)
+    tabBar = ribbonbar.tabBar()
+
+    def checkIndices():
+        titles = [tabBar.tabText(i) for i in range(tabBar.count())]
+        assert tabBar.tabTitles() == titles
+        for i, title in enumerate(titles):
+            assert tabBar.indexOf(title) == i
+            assert tabBar.indexOfData(ribbonbar.categories()[title]) == i
+
+    category1 = ribbonbar.addCategory("Category 1")
+    ribbonbar.addCategory("Category 2")
+    context = ribbonbar.addContextCategory("Context 1")
+    contexts = ribbonbar.addContextCategories("Contexts", ["Context 2", "Context 3"])
+    ribbonbar.addCategory("Category 3")
+    checkIndices()
+    assert not ribbonbar.categoryVisible(context)
+
+    ribbonbar.showContextCategory(context)
+    contexts.showContextCategories()
+    checkIndices()
+    assert ribbonbar.categoryVisible(context) and contexts.categoriesVisible()
+    tabBar.moveTab(0, tabBar.count() - 1)
+    checkIndices()
+    assert tabBar.indexOfData(category1) == tabBar.count() - 1
+    tabBar.setTabText(tabBar.indexOf("Category 2"), "Category 2")
+    checkIndices()
+
+    ribbonbar.hideContextCategory(context)
+    contexts.hideContextCategories()
+    checkIndices()
+    assert not ribbonbar.categoryVisible(context) and not contexts.categoriesVisible()
+    ribbonbar.setCurrentCategory(category1)
+    assert tabBar.currentIndex() == tabBar.indexOf("Category 1")
+    ribbonbar.removeCategory(category1)
+    assert tabBar.indexOfData(category1) == -1 and tabBar.indexOf("Category 1") == -1
+
+
+@pytest.mark.parametrize("tabVisibilitySupported", [True, False])
+def test_context_tab_visibility(qtbot: QtBot, monkeypatch, tabVisibilitySupported):
+    monkeypatch.setattr(RibbonTabBar, "_tabVisibilitySupported", tabVisibilitySupported)
+    ribbonbar = RibbonBar()
+    qtbot.addWidget(ribbonbar)
+    tabBar = ribbonbar.tabBar()
+    category1 = ribbonbar.addCategory("Category 1")
+    context = ribbonbar.addContextCategory("Context 1")
+    contexts = ribbonbar.addContextCategories("Contexts", ["Context 2", "Context 3"])
+    category2 = ribbonbar.addCategory("Category 2")
+    if tabVisibilitySupported:
+        assert tabBar.tabTitles() == ["Category 1", "Category 2", "Context 1", "Context 2", "Context 3"]
+    else:
+        assert tabBar.tabTitles() == ["Category 1", "Category 2"]
+    assert not ribbonbar.categoryVisible(context) and not contexts.categoriesVisible()
+    with pytest.raises(ValueError):
+        ribbonbar.setCurrentCategory(context)
+
+    count = tabBar.count()
+    for _ in range(2):
+        ribbonbar.showContextCategory(context)
+        contexts.showContextCategories()
+    assert tabBar.count() == (count if tabVisibilitySupported else count + 3)
+    assert ribbonbar.categoryVisible(context) and contexts.categoriesVisible()
+    assert tabBar.currentIndex() == tabBar.indexOfData(contexts["Context 2"])
+    assert ribbonbar.currentCategory() is contexts["Context 2"]
+    ribbonbar.setCurrentCategory(context)
+    assert tabBar.currentIndex() == tabBar.indexOfData(context)
+    assert [tabBar.indexOfData(category1), tabBar.indexOfData(category2)] == [0, 1]
+
+    ribbonbar.hideContextCategory(context)
+    contexts.hideContextCategories()
+    assert tabBar.count() == count
+    assert not ribbonbar.categoryVisible(context) and not contexts.categoriesVisible()
+    assert [tabBar.indexOfData(category1), tabBar.indexOfData(category2)] == [0, 1]
+    assert ribbonbar.currentCategory() in (category1, category2)
+
+
+def test_tab_colors(qtbot: QtBot):
+    ribbonbar = RibbonBar()
+    qtbot.addWidget(ribbonbar)
+    tabBar = ribbonbar.tabBar()
+    category1 = ribbonbar.addCategory("Category 1")
+    category2 = ribbonbar.addCategory("Category 2")
+    context = ribbonbar.addContextCategory("Context 1", QtGui.QColor(255, 157, 0))
+    ribbonbar.show()
+    assert tabBar.tabTextColor(tabBar.indexOfData(category1)) == QtGui.QColor(QtCore.Qt.GlobalColor.black)
+
+    tabBar.setStyleSheet = None  # fails if the tab bar is styled with a style sheet
+    ribbonbar.showContextCategory(context)
+    assert tabBar.tabTextColor(tabBar.indexOfData(context)) == QtGui.QColor(255, 157, 0)
+    assert not tabBar.tabTextColor(tabBar.indexOfData(category1)).isValid()
+    ribbonbar.setCurrentCategory(category2)
+    assert tabBar.tabTextColor(tabBar.indexOfData(category2)) == QtGui.QColor(QtCore.Qt.GlobalColor.black)
+    assert not tabBar.tabTextColor(tabBar.indexOfData(context)).isValid()
+    assert tabBar.styleSheet() == ""
+    tabBar.repaint()
+
+
+def test_context_tab_marks(qtbot: QtBot):
+    ribbonbar = RibbonBar()
+    qtbot.addWidget(ribbonbar)
+    tabBar = ribbonbar.tabBar()
+    ribbonbar.addCategory("Category 1")
+    context = ribbonbar.addContextCategory("Context 1", QtGui.QColor(255, 0, 0))
+    tabBar.addTab("Colored", QtGui.QColor(255, 0, 0))
+    ribbonbar.resize(800, ribbonbar.height())
+    ribbonbar.show()
+    ribbonbar.showContextCategory(context)
+    qtbot.waitExposed(ribbonbar)
+
+    # only the tabs of the context categories have a band of their color at the top
+    image = tabBar.grab().toImage()
+    contextRect, coloredRect = tabBar.tabRect(tabBar.indexOf("Context 1")), tabBar.tabRect(tabBar.indexOf("Colored"))
+    assert image.pixelColor(contextRect.center().x(), contextRect.top()) == QtGui.QColor(255, 0, 0)
+    assert image.pixelColor(coloredRect.center().x(), coloredRect.top()) != QtGui.QColor(255, 0, 0)
+
+
+def test_context_tab_color_with_style_sheet(qtbot: QtBot):
+    ribbonbar = RibbonBar()
+    qtbot.addWidget(ribbonbar)
+    tabBar = ribbonbar.tabBar()
+    ribbonbar.addCategory("Category 1")
+    context = ribbonbar.addContextCategory("Context 1", QtGui.QColor(255, 0, 0))
+    ribbonbar.setRibbonStyle(RibbonStyle.Debug)  # the style sheet sets the color of the selected tab
+    ribbonbar.resize(800, ribbonbar.height())
+    ribbonbar.show()
+    ribbonbar.showContextCategory(context)
+    qtbot.waitExposed(ribbonbar)
+
+    # the label of the context tab, under the band, keeps the color of its category
+    image = tabBar.grab().toImage()
+    rect = tabBar.tabRect(tabBar.indexOf("Context 1"))
+    label = [
+        image.pixelColor(x, y)
+        for x in range(rect.left(), rect.right())
+        for y in range(rect.top() + tabBar._contextCategoryDarkColorHeight, rect.bottom() - 3)
+    ]
+    assert QtGui.QColor(255, 0, 0) in label